@@ -0,0 +1,203 @@
+"""
+GUI（テーブル）の応答性ベンチマーク。画面なし（QT_QPA_PLATFORM=offscreen）で動く
+
+  python -m bench_gui [オプション]
+
+- 1万 / 10万 / 100万行などで MainWindow を実際に操作し、操作ごとに計測する
+    load      … 一覧の読み込み（_finish_listing → load_list_only）
+    scan      … 走査と同じく小分けに追加 → パス順に並べ替え（append_list_only / sort_by_path）
+    preview   … バックグラウンドのプレビュー（PreviewWorker → apply_preview_result）
+    sort:列名 … ヘッダクリックの並べ替え（_on_header_clicked。昇順/降順）
+    filter    … 「選択のみ表示」の切り替え（_apply_selection_filter）
+- seconds は操作を始めてからイベントループが空くまで（遅れて走る再レイアウト・再描画を含む）、
+  call_seconds は呼び出しそのもの。あわせてメインスレッドの止まった時間を測る（ハートビートのタイマーが遅れた分）
+    stall_max_ms … 最長の停止 / stall_total_ms … 停止の合計 / stalls_over_50ms … 50ms を超えた回数
+- 結果は JSON（meta は bench_processor と同じ）。--compare で以前の結果と比べる
+- 設定・ジャーナルは一時フォルダに作る（普段の設定には触らない）
+"""
+import os
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+import argparse, json, shutil, sys, tempfile, time
+from PySide6.QtCore import QObject, QTimer, QEventLoop, Qt
+from PySide6.QtWidgets import QApplication
+from processor import FileEntry
+from widgets import COL_STATUS, COL_BEFORE, COL_AFTER, COL_DIR, RenameModel
+from workers import ScanWorker
+from bench_processor import PATTERNS, iter_tree, _meta
+
+STALL_MS = 50   # これを超える停止は「引っかかり」として数える
+
+class Heartbeat(QObject):
+    # メインスレッドで一定間隔に動くタイマー。間隔が空いた分＝イベントループが止まっていた時間
+    def __init__(self, interval_ms: int = 5, parent=None):
+        super().__init__(parent)
+        self.interval = interval_ms / 1000
+        self._timer = QTimer(self); self._timer.setTimerType(Qt.PreciseTimer); self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self._tick)
+        self.gaps: list[float] = []
+        self.ticks: list[float] = []
+        self._last = 0.0
+
+    def start(self):
+        self.gaps = []; self.ticks = []; self._last = time.perf_counter(); self._timer.start()
+
+    def stop(self):
+        self._tick(); self._timer.stop()
+
+    def _tick(self):
+        now = time.perf_counter()
+        self.gaps.append(now - self._last); self.ticks.append(now); self._last = now
+
+    def busy_until(self, since: float) -> float:
+        # since 以降で、ループが最後に止まっていた区間の終わり（遅れて走る再レイアウト・再描画も含める）
+        late = 2 * self.interval
+        return max((t for t, g in zip(self.ticks, self.gaps) if g > late and t - g >= since - late), default=since)
+
+    def stalls(self) -> dict:
+        over = [max(0.0, g - self.interval) for g in self.gaps]
+        return dict(stall_max_ms=round(max(over, default=0.0) * 1000, 1),
+                    stall_total_ms=round(sum(over) * 1000, 1),
+                    stalls_over_50ms=sum(1 for s in over if s * 1000 > STALL_MS))
+
+def run_op(app: QApplication, hb: Heartbeat, steps, settle_ms: int = 100) -> tuple[float, float, dict]:
+    """
+    steps（ジェネレーター）をイベントループの中で進める。yield のたびにループへ戻る
+    （yield した値があれば、その ms だけ待ってから続きへ）。
+    戻り値は (最初の一歩からループが空くまでの秒数, 呼び出し自体の秒数, 停止時間)
+    """
+    loop = QEventLoop()
+    wall = [0.0, 0.0]
+    def step():
+        try:
+            delay = next(steps)
+        except StopIteration:
+            app.processEvents()   # 溜まった再描画・レイアウトも含める
+            wall[1] = time.perf_counter()
+            QTimer.singleShot(settle_ms, loop.quit)
+            return
+        QTimer.singleShot(delay or 0, step)
+    def first():
+        wall[0] = time.perf_counter(); step()
+    hb.start()
+    QTimer.singleShot(settle_ms, first)
+    loop.exec()
+    hb.stop()
+    return max(wall[1], hb.busy_until(wall[0])) - wall[0], wall[1] - wall[0], hb.stalls()
+
+# ---------- 操作 ----------
+def _load(mw, entries):
+    mw.flat_items = list(entries); mw._entry_of = {e.path: e for e in entries}
+    mw._finish_listing()
+    yield from ()
+
+def _scan(mw, entries):
+    mw.table.clear_rows()
+    paths = [e.path for e in entries]
+    for i in range(0, len(paths), ScanWorker.BATCH_MAX):
+        mw.table.append_list_only(paths[i:i + ScanWorker.BATCH_MAX])
+        yield
+    mw.table.sort_by_path()
+    mw._apply_selection_filter()
+
+def _preview(mw):
+    mw._do_preview()
+    while mw._preview_worker is not None:
+        yield 5   # ワーカーのスレッドに GIL を譲る
+
+def _sort(mw, col):
+    mw._on_header_clicked(col)
+    yield from ()
+
+def _filter(mw, on: bool):
+    mw.cb_show_checked_only.setChecked(on)
+    yield from ()
+
+def run(args) -> list[dict]:
+    app = QApplication.instance() or QApplication([])
+    from gui_main import MainWindow   # QApplication の後に読み込む
+    results: list[dict] = []
+    work = tempfile.mkdtemp(prefix="rntbench_gui_")
+    cwd = os.getcwd()
+    os.chdir(work)
+    try:
+        mw = MainWindow()
+        mw.cb_live_preview.setChecked(False); mw.cb_watch.setChecked(False)
+        mw.method.setCurrentText("文字列追加"); mw.ed_add_text.setText("new_")
+        mw.show()
+        hb = Heartbeat(args.interval, mw)
+        headers = RenameModel.HEADERS
+        for n in args.rows:
+            t0 = 1_700_000_000.0
+            entries = [FileEntry(os.path.join(d, name), False, 0, t0, t0)
+                       for d, names in iter_tree(os.path.join(work, "tree"), n, args.depth, args.fanout,
+                                                 args.pattern, args.collision_rate, args.seed)
+                       for name in names]
+            ops = [("load", lambda: _load(mw, entries)),
+                   ("scan", lambda: _scan(mw, entries)),
+                   ("preview", lambda: _preview(mw))]
+            for col in (COL_BEFORE, COL_AFTER, COL_DIR, COL_STATUS):
+                for order in ("asc", "desc"):
+                    ops.append((f"sort:{headers[col]}:{order}", lambda col=col: _sort(mw, col)))
+            ops += [("filter:on", lambda: _filter(mw, True)),
+                    ("sort:filtered", lambda: _sort(mw, COL_BEFORE)),
+                    ("filter:off", lambda: _filter(mw, False))]
+            for name, make in ops:
+                if name == "filter:on":
+                    # 3行に1行のチェックを外しておく（表示行が減る）
+                    mw.table.source.set_checked_rows(range(0, n, 3), False)
+                sec, call, st = run_op(app, hb, make())
+                row = dict(rows=n, op=name, seconds=round(sec, 6), call_seconds=round(call, 6),
+                           per_sec=round(n / sec) if sec > 0 else None, **st)
+                results.append(row)
+                print(f"{n:>9} {name:<20} {sec:9.3f}s  stall max {st['stall_max_ms']:8.1f}ms"
+                      f"  total {st['stall_total_ms']:9.1f}ms  >{STALL_MS}ms x{st['stalls_over_50ms']}",
+                      file=sys.stderr, flush=True)
+            mw.table.clear_rows(); mw.flat_items = []; mw._entry_of = {}; mw._sort_order = {}
+            entries = None
+        mw.close()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work, ignore_errors=True)
+    return results
+
+def compare(old: dict, new: dict):
+    # 同じ (行数, 操作) の秒数と最長停止を比べる。比 > 1 は遅くなった
+    base = {(r["rows"], r["op"]): r for r in old["results"]}
+    print(f"# compare {old['meta'].get('commit')} -> {new['meta'].get('commit')}", file=sys.stderr)
+    for r in new["results"]:
+        b = base.get((r["rows"], r["op"]))
+        if b is None or not b["seconds"]: continue
+        ratio = r["seconds"] / b["seconds"]
+        flag = "  <-- slower" if ratio > 1.1 else ""
+        print(f"{r['rows']:>9} {r['op']:<20} {b['seconds']:9.3f}s -> {r['seconds']:9.3f}s  x{ratio:.2f}"
+              f"  stall {b['stall_max_ms']:.0f} -> {r['stall_max_ms']:.0f}ms{flag}", file=sys.stderr)
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="bench_gui", description="ReNameTool GUI responsiveness benchmark")
+    ap.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000], help="行数（複数可。例: 10000 100000 1000000）")
+    ap.add_argument("--depth", type=int, default=2, help="フォルダの深さ")
+    ap.add_argument("--fanout", type=int, default=10, help="1フォルダあたりのサブフォルダ数")
+    ap.add_argument("--pattern", choices=sorted(PATTERNS), default="photo", help="名前の型")
+    ap.add_argument("--collision-rate", type=float, default=0.05, help="衝突する名前の割合（0〜0.5）")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--interval", type=int, default=5, help="ハートビートの間隔（ms）")
+    ap.add_argument("-o", "--output", help="結果の JSON（既定: 標準出力）")
+    ap.add_argument("--compare", help="比べる以前の結果 JSON")
+    return ap
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    data = dict(meta=_meta(args), results=run(args))
+    text = json.dumps(data, ensure_ascii=False, indent=1)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), data)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
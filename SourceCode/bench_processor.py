@@ -0,0 +1,269 @@
+"""
+processor.py のベンチマーク（Qt を読み込まない）
+
+  python -m bench_processor [オプション]
+
+- 合成したフォルダツリー（深さ / 分岐数 / 名前の型 / 衝突率）に対して、リネーム方法ごとに各段階を計測する
+    collect   … フォルダ走査＋並べ替え（_collect_entries）
+    transform … 名前の変換（衝突解決の前）
+    unique    … 衝突解決（_assign_unique_targets）
+    plan      … generate_plan 全体 / stream … iter_plan を流すだけ（計画を溜めない）
+    apply     … apply_plan（--apply のときだけ。方法ごとに作り直したツリーを実際にリネーム）
+- 結果（秒・件/秒・ピークメモリ）を JSON で出力。--compare で以前の JSON と比べる（コミット間の比較用）
+- --in-memory はディスクに作らずパスだけ合成する（collect / apply なし。1000万件規模向け）
+- ツリーは --root の下に作って最後に消す。tmpfs（/dev/shm など）を指定するとディスクの影響を除ける
+"""
+import argparse, gc, json, os, platform, random, shutil, subprocess, sys, tempfile, time, tracemalloc
+from datetime import datetime
+from processor import (Settings, FileEntry, RenamePlan, compile_prefilter, generate_plan, iter_plan, apply_plan,
+                       _collect_entries, _iter_raw_files, _assign_unique_targets, _plan_transform)
+from renamer_cli import DEFAULTS
+from utils import path_sort_key
+
+# 方法ごとの設定。置換/エリア削除は "(copy)" 付きの名前を元の名前へ戻す → 衝突率の分だけ衝突する
+CASES = {
+    "リネーム（置換）": dict(target="(copy)", replacement="", rename_second_active=True,
+                          target_second="_", replacement_second=" "),
+    "エリア文字削除": dict(surrounded_start="(", surrounded_end=")"),
+    "連番": dict(sequence_mode="前に追加", sequence_digits=6),
+    "日付": dict(date_mode="末尾に追加", date_type="更新日"),
+    "フォルダ名追加": dict(),
+    "文字列追加": dict(add_text="new_"),
+    "特定文字の移動/追加": dict(move_find="_", move_pos="後ろに追加"),
+}
+STAGES = ["collect", "transform", "unique", "plan", "stream", "apply"]
+DISK_STAGES = {"collect", "apply"}
+
+_WORDS = ["holiday", "scan", "report final", "meeting", "draft v2", "photo", "memo", "budget 2024"]
+_WORDS_JA = ["天気", "旅行 写真", "会議資料", "請求書", "ｽｷｬﾝ", "日記"]
+_EXTS = [".jpg", ".png", ".txt", ".pdf", ".tar.gz", ".docx", ""]
+
+def _name_photo(i: int, rnd: random.Random) -> str:
+    return f"IMG_{i:07d}.jpg"
+
+def _name_mixed(i: int, rnd: random.Random) -> str:
+    return f"{rnd.choice(_WORDS)}_{i}{rnd.choice(_EXTS)}"
+
+def _name_unicode(i: int, rnd: random.Random) -> str:
+    return f"{rnd.choice(_WORDS_JA)}_{i:06d}{rnd.choice(_EXTS)}"
+
+PATTERNS = {"photo": _name_photo, "mixed": _name_mixed, "unicode": _name_unicode}
+
+# ---------- ツリーの合成 ----------
+def _leaf_dirs(root: str, depth: int, fanout: int) -> list[str]:
+    dirs = [root]
+    for _ in range(depth):
+        dirs = [os.path.join(d, f"d{k:03d}") for d in dirs for k in range(fanout)]
+    return dirs
+
+def iter_tree(root: str, files: int, depth: int, fanout: int, pattern: str, collision_rate: float,
+              seed: int = 0):
+    """
+    (フォルダ, [名前...]) を末端フォルダごとに返す（同じ引数なら毎回同じツリー）。
+    collision_rate: 名前のうち "(copy)" 付きの複製が占める割合（最大 0.5。複製は直前の名前から作る）
+    """
+    rnd = random.Random(seed)
+    make = PATTERNS[pattern]
+    rate = min(max(collision_rate, 0.0), 0.5)
+    q = rate / (1 - rate)   # 元の名前の直後に複製を置く確率（複製の割合が rate になる）
+    leaves = _leaf_dirs(root, depth, fanout)
+    per, extra = divmod(files, len(leaves))
+    i = 0
+    for n, d in enumerate(leaves):
+        k = per + (n < extra)
+        if not k: continue
+        names, prev = [], None
+        for _ in range(k):
+            if prev is not None and rnd.random() < q:
+                stem, ext = os.path.splitext(prev)
+                names.append(f"{stem}(copy){ext}"); prev = None
+            else:
+                prev = make(i, rnd); names.append(prev)
+            i += 1
+        yield d, names
+
+def build_tree(root: str, args) -> int:
+    # ディスクにツリーを作る（空ファイル）。作った件数を返す
+    n = 0
+    flags = os.O_CREAT | os.O_WRONLY | getattr(os, "O_BINARY", 0)
+    for d, names in iter_tree(root, args.files_now, args.depth, args.fanout, args.pattern, args.collision_rate, args.seed):
+        os.makedirs(d, exist_ok=True)
+        for name in names:
+            os.close(os.open(os.path.join(d, name), flags, 0o644))
+        n += len(names)
+    return n
+
+def synth_entries(root: str, args) -> list[FileEntry]:
+    # --in-memory 用。日付は固定（stat しない）
+    t0 = 1_700_000_000.0
+    out = []
+    for d, names in iter_tree(root, args.files_now, args.depth, args.fanout, args.pattern, args.collision_rate, args.seed):
+        out.extend(FileEntry(os.path.join(d, name), False, 0, t0 + len(out), t0) for name in names)
+    out.sort(key=lambda e: path_sort_key(e.path))
+    return out
+
+# ---------- 計測 ----------
+def _measure(fn, repeat: int, memory: bool) -> tuple[float, object, int | None]:
+    # (最速の秒数, 最後の戻り値, ピークメモリ)。メモリは tracemalloc が遅いので時間とは別に1回流す
+    best, out = None, None
+    for _ in range(repeat):
+        out = None; gc.collect()
+        t = time.perf_counter()
+        out = fn()
+        t = time.perf_counter() - t
+        best = t if best is None else min(best, t)
+    peak = None
+    if memory:
+        out = None; gc.collect()
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        out = fn()
+        peak = tracemalloc.get_traced_memory()[1] - base
+        tracemalloc.stop()
+    return best, out, peak
+
+def _settings(method: str) -> Settings:
+    return Settings(**{**DEFAULTS, "method": method, **CASES[method]})
+
+def _transform(entries: list[FileEntry], st: Settings) -> list:
+    # generate_plan の変換部分だけ（衝突解決の前）
+    seq = st.method == "連番"
+    return list(_iter_raw_files(entries, st, _plan_transform(st, "file", None), "order" if seq else None,
+                                None, None if seq else compile_prefilter(st)))
+
+def run(args) -> list[dict]:
+    results: list[dict] = []
+    def record(files, method, stage, items, sec, peak, **extra):
+        row = dict(files=files, method=method, stage=stage, items=items, seconds=round(sec, 6),
+                   per_sec=round(items / sec) if sec > 0 else None, peak_bytes=peak, **extra)
+        results.append(row)
+        mem = f"{peak / 2**20:9.1f}MB" if peak is not None else ""
+        print(f"{files:>9} {method:<14} {stage:<9} {items:>9} {sec:9.3f}s {row['per_sec'] or 0:>11,}/s {mem}",
+              file=sys.stderr, flush=True)
+
+    stages = [s for s in args.stages if not (args.in_memory and s in DISK_STAGES)]
+    for files in args.files:
+        args.files_now = files
+        work = tempfile.mkdtemp(prefix="rntbench_", dir=args.root)
+        try:
+            root = os.path.join(work, "tree")
+            if args.in_memory:
+                entries = synth_entries(root, args)
+            else:
+                t = time.perf_counter(); build_tree(root, args)
+                print(f"# tree {files} files: {time.perf_counter() - t:.1f}s", file=sys.stderr, flush=True)
+                if "collect" in stages:
+                    sec, entries, peak = _measure(lambda: _collect_entries([root], True), args.repeat, args.memory)
+                    record(files, "-", "collect", len(entries), sec, peak)
+                else:
+                    entries = _collect_entries([root], True)
+            for method in args.methods:
+                st = _settings(method)
+                raw = None
+                if "transform" in stages or "unique" in stages:
+                    sec, raw, peak = _measure(lambda: _transform(entries, st), args.repeat, args.memory)
+                    if "transform" in stages:
+                        record(files, method, "transform", len(raw), sec, peak)
+                if "unique" in stages:
+                    sec, uniq, peak = _measure(lambda: _assign_unique_targets(raw), args.repeat, args.memory)
+                    moved = sum(a.new_path != b.new_path for a, b in zip(raw, uniq))
+                    record(files, method, "unique", len(uniq), sec, peak, collisions=moved)
+                    uniq = None
+                raw = None
+                if "plan" in stages:
+                    sec, plan, peak = _measure(lambda: generate_plan(entries, st), args.repeat, args.memory)
+                    record(files, method, "plan", len(plan), sec, peak)
+                    plan = None
+                if "stream" in stages:
+                    sec, n, peak = _measure(lambda: sum(1 for _ in iter_plan(entries, st)), args.repeat, args.memory)
+                    record(files, method, "stream", n, sec, peak)
+                if "apply" in stages:
+                    record(files, method, "apply", *_bench_apply(work, st, args))
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+    return results
+
+def _bench_apply(work: str, st: Settings, args) -> tuple[int, float, None]:
+    # リネームすると元に戻せないので、毎回ツリーを作り直して1回だけ計る（メモリは計らない）
+    root = os.path.join(work, "apply")
+    build_tree(root, args)
+    try:
+        plan = RenamePlan(generate_plan(_collect_entries([root], True), st))
+        gc.collect()
+        t = time.perf_counter()
+        res = apply_plan(plan, workers=args.workers)
+        sec = time.perf_counter() - t
+        if res.failed_count:
+            print(f"# apply: {res.failed_count} 件失敗", file=sys.stderr)
+        return len(plan), sec, None
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+# ---------- 出力 ----------
+def _meta(args) -> dict:
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=here, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    opts = {k: v for k, v in vars(args).items() if k not in ("output", "compare", "files_now")}
+    return dict(commit=commit, started=datetime.now().isoformat(timespec="seconds"),
+                python=platform.python_version(), platform=platform.platform(), cpus=os.cpu_count(), args=opts)
+
+def compare(old: dict, new: dict):
+    # 同じ (件数, 方法, 段階) の秒数を比べる。比 > 1 は遅くなった
+    key = lambda r: (r["files"], r["method"], r["stage"])
+    base = {key(r): r for r in old["results"]}
+    print(f"# compare {old['meta'].get('commit')} -> {new['meta'].get('commit')}", file=sys.stderr)
+    tree = ("depth", "fanout", "pattern", "collision_rate", "seed", "in_memory", "root")
+    diff = [k for k in tree if old["meta"]["args"].get(k) != new["meta"]["args"].get(k)]
+    if diff:
+        print(f"# 注意: ツリーの条件が違う ({', '.join(diff)})", file=sys.stderr)
+    for r in new["results"]:
+        b = base.get(key(r))
+        if b is None or not b["seconds"]: continue
+        ratio = r["seconds"] / b["seconds"]
+        flag = "  <-- slower" if ratio > 1.1 else ""
+        print(f"{r['files']:>9} {r['method']:<14} {r['stage']:<9} {b['seconds']:9.3f}s -> {r['seconds']:9.3f}s"
+              f"  x{ratio:.2f}{flag}", file=sys.stderr)
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="bench_processor", description="ReNameTool processor benchmark")
+    ap.add_argument("--files", type=int, nargs="+", default=[10_000, 100_000], help="ファイル数（複数可）")
+    ap.add_argument("--depth", type=int, default=2, help="フォルダの深さ")
+    ap.add_argument("--fanout", type=int, default=10, help="1フォルダあたりのサブフォルダ数")
+    ap.add_argument("--pattern", choices=sorted(PATTERNS), default="photo", help="名前の型")
+    ap.add_argument("--collision-rate", type=float, default=0.05, help="衝突する名前の割合（0〜0.5）")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--methods", nargs="+", choices=list(CASES), default=list(CASES))
+    ap.add_argument("--stages", nargs="+", choices=STAGES, default=[s for s in STAGES if s != "apply"])
+    ap.add_argument("--apply", action="store_true", help="apply も計る（ツリーを作り直して実際にリネーム）")
+    ap.add_argument("--workers", type=int, default=1, help="apply の並列数")
+    ap.add_argument("--in-memory", action="store_true", help="ディスクに作らずパスだけ合成する")
+    ap.add_argument("--root", help="ツリーを作る場所（既定: 一時フォルダ。tmpfs 推奨）")
+    ap.add_argument("--repeat", type=int, default=1, help="各段階の試行回数（最速を採用）")
+    ap.add_argument("--no-memory", dest="memory", action="store_false", help="ピークメモリを計らない（速い）")
+    ap.add_argument("-o", "--output", help="結果の JSON（既定: 標準出力）")
+    ap.add_argument("--compare", help="比べる以前の結果 JSON")
+    return ap
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.apply and "apply" not in args.stages:
+        args.stages.append("apply")
+    meta = _meta(args)
+    data = dict(meta=meta, results=run(args))
+    text = json.dumps(data, ensure_ascii=False, indent=1)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), data)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
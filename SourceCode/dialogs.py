@@ -17,6 +17,8 @@ README_MD = r"""
 - **「拡張子も含む」**：置換モード時に拡張子も対象にできる
 - **ウィンドウ位置/サイズ・列幅/順序の保存**：次回起動時に復元
 - **Delキーで除外**：行選択して Del（またはBackspace）で「選択」チェックをOFF
+- **元に戻す**：直前のリネームをジャーナル（ReNameTool_journal.jsonl）から取り消し
+- **中断からの復旧**：実行中に落ちても、次回起動時に中断したリネームを元の名前へ自動で戻す
 - **ナチュラルソート**：リネーム前/後の並びは数値を考慮した自然な順
 - **特定文字の移動/追加**：検索語を頭/後ろに移動または追加  
   - 追加オプション：**全部削除** / **区切り自動付与（スペース/_/-）** / **正規表現モード** / **親フォルダにも適用**
@@ -1,34 +1,41 @@
-import os, base64, re
+import os, base64
+from contextlib import nullcontext
 from PySide6.QtCore import Qt, QEvent, QPoint, QTimer
 from PySide6.QtGui import QIcon
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QLineEdit, QComboBox,
-    QCheckBox, QSpinBox, QAbstractSpinBox, QFrame, QTableWidgetItem, QSizePolicy
+    QCheckBox, QSpinBox, QAbstractSpinBox, QFrame, QSizePolicy
 )
 from style import build_qss, GAP_DEFAULT, PADDING_CARD, RESIZE_MARGIN
 from widgets import RenameTable
+from workers import ScanWorker, PreviewWorker
 from dialogs import ReadmeDialog
-from processor import (
-    Settings, generate_rename_plan, generate_rename_plan_in_order,
-    generate_rename_plan_for_dirs, generate_rename_plan_in_order_per_dir,
-    apply_rename, RenameItem, _collect_paths
-)
-from utils import resource_path, save_error_log
+from processor import (Settings, TransformCache, iter_plan, collect_dirs, apply_plan, RenamePlan, RenameResults, FileEntry,
+                       scan_dir, iter_collect_entries)
+from utils import resource_path, save_error_log, log_failures, ERROR_LOG_FILE
 from config import ConfigStore
+from journal import RenameJournal
+from listing_cache import ListingCache
+from watcher import FolderWatcher
+from profiling import Profile, Capture, stage
 
 CFG_FILE = "ReNameTool_config.json"
+JOURNAL_FILE = "ReNameTool_journal.jsonl"
+LISTING_CACHE_FILE = "ReNameTool_listing.sqlite3"
 CFG_KEY_GEOM = "win_geometry_b64"
 CFG_KEY_HDR  = "table_header_b64"
 CFG_KEY_SCOPE = "rename_scope"
+CFG_KEY_WORKERS = "rename_workers"
+CFG_KEY_LIVE = "live_preview"
+CFG_KEY_WATCH = "watch_folders"
+CFG_KEY_PROFILE = "profile_stats"
+LIVE_PREVIEW_MS = 250   # ライブプレビュー：最後の入力からこの時間待って計算
+PROFILE_TOAST_MS = 8000 # 計測結果を付けたトーストの表示時間
 
 LEFT_FIXED_WIDTH = 320
 TARGET_FILES   = "ファイル"
 TARGET_FOLDERS = "フォルダ"
 
-def _natural_key(name_or_path: str):
-    base = os.path.basename(name_or_path)
-    return [int(t) if t.isdigit() else t.lower() for t in re.split(r'(\d+)', base)]
-
 class MainWindow(QWidget):
     def __init__(self):
         super().__init__()
@@ -178,6 +185,12 @@ class MainWindow(QWidget):
         self.cb_ext = QCheckBox("拡張子も含む")
         row_common.addWidget(self.cb_sub); row_common.addWidget(self.cb_ext); row_common.addStretch()
         llay.addLayout(row_common)
+        # 並列リネーム（ネットワークドライブ向け。1=従来どおり直列）
+        row_workers = QHBoxLayout()
+        self.spin_workers = QSpinBox(); self.spin_workers.setRange(1, 32); self.spin_workers.setValue(1)
+        self.spin_workers.setToolTip("別々のフォルダを同時にリネームする数（1=直列）")
+        row_workers.addWidget(self._line("並列リネーム数", self.spin_workers)); row_workers.addStretch()
+        llay.addLayout(row_workers)
 
         # 左下
         llay.addStretch(1)
@@ -185,9 +198,18 @@ class MainWindow(QWidget):
         row8_top = QHBoxLayout()
         self.btn_preview = QPushButton("プレビュー")
         self.btn_run = QPushButton("リネーム実行"); self.btn_run.setEnabled(False)
-        row8_top.addStretch(); row8_top.addWidget(self.btn_preview); row8_top.addWidget(self.btn_run)
+        self.btn_undo = QPushButton("元に戻す"); self.btn_undo.setEnabled(False)
+        self.cb_live_preview = QCheckBox("ライブ")
+        self.cb_live_preview.setToolTip("設定を変えるたびに自動でプレビュー")
+        self.cb_profile = QCheckBox("計測")
+        self.cb_profile.setToolTip("走査/プレビュー/実行の段階ごとの時間と件数を表示し、ReNameTool_profile.jsonl に記録")
+        self.cb_capture = QCheckBox("詳細")
+        self.cb_capture.setToolTip("次のプレビュー/実行1回を詳しくプロファイル（cProfile。pyinstrument があればそちら）")
+        row8_top.addWidget(self.cb_live_preview); row8_top.addWidget(self.cb_profile); row8_top.addWidget(self.cb_capture)
+        row8_top.addStretch(); row8_top.addWidget(self.btn_preview); row8_top.addWidget(self.btn_run); row8_top.addWidget(self.btn_undo)
         row8.addLayout(row8_top)
         self.lbl_status = QLabel(""); self.lbl_status.setStyleSheet("color:#cfe3ff; font-size:11px;")
+        self.lbl_status.setWordWrap(True)
         row8.addWidget(self.lbl_status)
         llay.addLayout(row8)
 
@@ -196,8 +218,11 @@ class MainWindow(QWidget):
         cap = QHBoxLayout()
         cap.addWidget(self._label("プレビュー", "SectionTitle")); cap.addStretch()
         self.cb_show_checked_only = QCheckBox("選択のみ表示")
+        self.cb_watch = QCheckBox("フォルダ監視")
+        self.cb_watch.setToolTip("読み込んだフォルダの追加/削除/改名を一覧へ自動反映（対象＝ファイルのとき）")
         self.btn_list_clear = QPushButton("ListClear")
-        cap.addWidget(self.cb_show_checked_only); cap.addWidget(self.btn_list_clear)
+        self.btn_scan_cancel = QPushButton("スキャン中止"); self.btn_scan_cancel.setVisible(False)
+        cap.addWidget(self.cb_watch); cap.addWidget(self.cb_show_checked_only); cap.addWidget(self.btn_scan_cancel); cap.addWidget(self.btn_list_clear)
         rlay.addLayout(cap)
         self.table = RenameTable(); rlay.addWidget(self.table, 1)
 
@@ -211,7 +236,23 @@ class MainWindow(QWidget):
         self._start_mouse = QPoint(); self._start_geo = None
 
         # 状態
-        self.paths = []; self.flat_items = []; self._sort_order = {}
+        self.paths = []; self.flat_items: list[FileEntry] = []; self._sort_order = {}
+        self._entry_of: dict[str, FileEntry] = {}   # パス→走査時のメタデータ（再statを避ける）
+        self._scanned_dirs: list[str] = []          # 直近の走査で読めたフォルダ（監視対象）
+        self._dir_files: dict[str, set[str]] = {}   # 監視中：フォルダ → 一覧にあるそのフォルダのファイル
+        self.watcher = FolderWatcher(self)
+        self._preview_shown = False
+        self._scan_worker: ScanWorker | None = None
+        self._preview_worker: PreviewWorker | None = None
+        self._retired: set = set()   # 置き換えたが、まだ止まっていないワーカー（閉じるときに待つ）
+        self._preview_gen = 0   # プレビューの世代番号（古い計算結果を捨てる）
+        self._preview_targets: list[str] = []
+        self._preview_seen: set[str] = set()
+        self._preview_quiet = False
+        self._scan_prof: Profile | None = None
+        self._preview_prof: Profile | None = None
+        self._transform_cache = TransformCache()
+        self._live_timer = QTimer(self); self._live_timer.setSingleShot(True); self._live_timer.setInterval(LIVE_PREVIEW_MS)
         self.setStyleSheet(build_qss())
 
         # 設定ロード
@@ -220,10 +261,17 @@ class MainWindow(QWidget):
         self._restore_window_and_header()
         self._update_scope_hint()
 
+        # ジャーナル：前回中断したリネームの後始末 → 取り消しボタンの状態
+        self.journal = RenameJournal(JOURNAL_FILE)
+        self.listing_cache = ListingCache(LISTING_CACHE_FILE)
+        self._recover_journal()
+
         # シグナル
         self.btn_preview.clicked.connect(self._do_preview)
         self.btn_run.clicked.connect(self._do_run)
+        self.btn_undo.clicked.connect(self._do_undo)
         self.btn_list_clear.clicked.connect(self._on_list_clear)
+        self.btn_scan_cancel.clicked.connect(self._cancel_scan)
         self.method.currentTextChanged.connect(self._update_panels)
         self.table.horizontalHeader().sectionClicked.connect(self._on_header_clicked)
         self.cb_sub.stateChanged.connect(lambda _ : self._refresh_listing_after_scope_change())
@@ -231,6 +279,11 @@ class MainWindow(QWidget):
         self.btn_digits_minus.clicked.connect(lambda: self.spin_digits.setValue(max(self.spin_digits.minimum(), self.spin_digits.value()-1)))
         self.btn_digits_plus.clicked.connect(lambda: self.spin_digits.setValue(min(self.spin_digits.maximum(), self.spin_digits.value()+1)))
         self.cb_show_checked_only.stateChanged.connect(lambda _ : self._apply_selection_filter())
+        self._connect_settings_edits()
+        self._live_timer.timeout.connect(self._live_preview)
+        self.cb_live_preview.toggled.connect(lambda on: on and self._schedule_live_preview())
+        self.cb_watch.toggled.connect(self._on_watch_toggled)
+        self.watcher.dirty.connect(self._on_watch_dirty)
 
         self._update_panels()
 
@@ -256,6 +309,32 @@ class MainWindow(QWidget):
         self.lbl_status.setText(text)
         QTimer.singleShot(ms, lambda: self.lbl_status.setText(""))
 
+    # ===== 計測 =====
+    def _new_profile(self, op: str) -> Profile | None:
+        return Profile(op) if self.cb_profile.isChecked() else None
+
+    def _take_capture(self) -> bool:
+        # 「詳細」は次の1回だけ
+        if not self.cb_capture.isChecked(): return False
+        self.cb_capture.setChecked(False)
+        return True
+
+    def _toast_report(self, text: str, prof: Profile | None, captured: str | None = None):
+        # 計測していれば結果を付けて長めに表示し、ログにも書く
+        if prof is None and not captured:
+            if text: self._toast(text)
+            return
+        parts = [text] if text else []
+        if prof is not None:
+            prof.finish()
+            parts.append(prof.summary())
+            try:
+                prof.write_log()
+            except OSError as e:
+                save_error_log("profile", str(e))
+        if captured: parts.append(f"詳細: {captured}")
+        self._toast("　".join(parts), PROFILE_TOAST_MS)
+
     # ===== スコープ/ドラッグ&ドロップ =====
     def _current_scope(self) -> str:
         return "folder" if self.combo_scope.currentText() == TARGET_FOLDERS else "file"
@@ -276,26 +355,91 @@ class MainWindow(QWidget):
         self._toast("ドロップ受け取りました。")
 
     def _unique_dirs_from_paths(self, paths: list[str]) -> list[str]:
-        s = set()
-        for p in paths:
-            ap = os.path.abspath(p)
-            if os.path.isdir(ap): s.add(ap)
-            elif os.path.isfile(ap): s.add(os.path.dirname(ap))
-        return sorted(s)
+        return collect_dirs(paths)
 
     def _refresh_listing_after_scope_change(self):
+        self._cancel_scan(silent=True)
+        self._cancel_preview()
+        self._stop_watch(); self._scanned_dirs = []; self._preview_shown = False
         if not self.paths:
             self.table.clear_rows(); self.btn_run.setEnabled(False); return
         if self._current_scope() == "file":
-            self.flat_items = _collect_paths(self.paths, include_subfolders=self.cb_sub.isChecked())
-        else:
-            self.flat_items = self._unique_dirs_from_paths(self.paths)
+            self._start_scan(self.paths, include_subfolders=self.cb_sub.isChecked())
+            return
+        self.flat_items = [FileEntry(d, True) for d in self._unique_dirs_from_paths(self.paths)]
+        self._entry_of = {e.path: e for e in self.flat_items}
+        self._finish_listing()
+        self._schedule_live_preview()
+
+    def _finish_listing(self):
         if not self.flat_items:
             self.table.clear_rows(); self.btn_run.setEnabled(False); self._toast("対象が見つからなかったよ。"); return
-        self.table.load_list_only(self.flat_items)
+        self.table.load_list_only([e.path for e in self.flat_items])
         self.btn_run.setEnabled(True)
         self._apply_selection_filter()
 
+    # ===== バックグラウンド走査 =====
+    def _start_scan(self, paths: list[str], include_subfolders: bool):
+        self.flat_items = []; self._entry_of = {}
+        self._transform_cache.clear()
+        self._stop_watch(); self._scanned_dirs = []; self._preview_shown = False
+        self.table.clear_rows(); self.btn_run.setEnabled(False)
+        self._scan_prof = self._new_profile("scan")
+        w = ScanWorker(paths, include_subfolders, cache=self.listing_cache, prof=self._scan_prof, parent=self)
+        w.batch.connect(self._on_scan_batch)
+        w.progress.connect(self._on_scan_progress)
+        w.failed.connect(self._on_scan_failed)
+        w.done.connect(self._on_scan_done)
+        w.finished.connect(w.deleteLater)
+        self._scan_worker = w
+        self.btn_scan_cancel.setVisible(True)
+        self.lbl_status.setText("スキャン中… 0 件")
+        w.start()
+
+    def _cancel_scan(self, silent: bool = False):
+        w = self._scan_worker
+        if w is None: return
+        w.requestInterruption()
+        if silent:
+            # 新しい走査に置き換える場合：古いワーカーの残りの通知は無視する
+            self._retire(w)
+            self._scan_worker = None
+            self.btn_scan_cancel.setVisible(False)
+
+    def _on_scan_batch(self, batch: list):
+        if self.sender() is not self._scan_worker: return
+        self.flat_items.extend(batch)
+        self._entry_of.update((e.path, e) for e in batch)
+        with stage(self._scan_prof, "table"):
+            self.table.append_list_only([e.path for e in batch])
+
+    def _on_scan_progress(self, n: int):
+        if self.sender() is not self._scan_worker: return
+        self.lbl_status.setText(f"スキャン中… {n} 件")
+
+    def _on_scan_failed(self, msg: str):
+        save_error_log("scan", msg)
+
+    def _on_scan_done(self, cancelled: bool):
+        if self.sender() is not self._scan_worker: return
+        w, self._scan_worker = self._scan_worker, None
+        self.btn_scan_cancel.setVisible(False)
+        if not cancelled:
+            self._scanned_dirs = w.dirs
+            self._start_watch()
+        if not self.flat_items:
+            self.table.clear_rows(); self.btn_run.setEnabled(False)
+            self._toast("スキャンを中止しました（0 件）" if cancelled else "対象が見つからなかったよ。"); return
+        # 走査は見つけた順に流しているので、最後に従来どおりのパス順へ揃える
+        prof, self._scan_prof = self._scan_prof, None
+        with stage(prof, "table"):
+            self.table.sort_by_path()
+            self.btn_run.setEnabled(True)
+            self._apply_selection_filter()
+        n = len(self.flat_items)
+        self._toast_report(f"スキャンを中止しました（{n} 件）" if cancelled else f"{n} 件を読み込みました。", prof)
+        self._schedule_live_preview()
+
     # ===== 設定まとめ =====
     def _gather_settings(self) -> Settings:
         return Settings(
@@ -353,149 +497,320 @@ class MainWindow(QWidget):
 
     # ===== プレビュー/実行 =====
     def _checked_paths_in_visual_order(self) -> list[str]:
-        out = []
-        for r in range(self.table.rowCount()):
-            cb = self.table._row_checkbox(r)
-            if cb and cb.isChecked():
-                out.append(self.table.item(r, self.table.COL_OLD).text())
-        return out
+        return self.table.checked_old_paths()
+
+    def _entries_for(self, paths: list[str]) -> list[FileEntry]:
+        # 走査済みのメタデータを計画生成へ渡す（無ければパスだけの FileEntry）
+        get = self._entry_of.get
+        folder = self._current_scope() == "folder"
+        return [get(p) or FileEntry(p, folder) for p in paths]
 
     def _do_preview(self):
         try:
             target_paths = self._checked_paths_in_visual_order()
             if not target_paths: self._toast("チェックされた行がありません。"); return
-            st = self._gather_settings()
-            scope = self._current_scope()
-
-            if scope == "folder":
-                items = generate_rename_plan_for_dirs(target_paths, st, visual_order=True)
-            else:
-                if st.method == "連番":
-                    items = generate_rename_plan_in_order_per_dir(target_paths, st) if st.sequence_per_folder else generate_rename_plan_in_order(target_paths, st)
-                else:
-                    items = generate_rename_plan(target_paths, st)
+            self._start_preview(self._entries_for(target_paths))
+        except Exception as e:
+            save_error_log("preview", str(e)); self._toast(f"プレビュー中にエラー: {e}")
 
-            plan = [{"old_path": it.old_path, "new_path": it.new_path} for it in items]
+    # ===== バックグラウンドプレビュー =====
+    def _start_preview(self, targets: list[FileEntry], quiet: bool = False):
+        self._cancel_preview()
+        self._preview_targets = [e.path for e in targets]; self._preview_seen = set()
+        self._preview_quiet = quiet
+        self._preview_prof = self._new_profile("preview")
+        w = PreviewWorker(self._preview_gen, targets, self._gather_settings(), self._current_scope(),
+                          cache=self._transform_cache, prof=self._preview_prof, capture=self._take_capture(), parent=self)
+        w.chunk.connect(self._on_preview_chunk)
+        w.failed.connect(self._on_preview_failed)
+        w.done.connect(self._on_preview_done)
+        w.finished.connect(w.deleteLater)
+        self._preview_worker = w
+        if not quiet: self.lbl_status.setText("プレビュー計算中…")
+        w.start()
+
+    def _cancel_preview(self):
+        # 世代を進めるので、古いワーカーから届く残りの通知はすべて無視される
+        self._preview_gen += 1
+        w = self._preview_worker
+        if w is None: return
+        w.requestInterruption()
+        self._retire(w)
+        self._preview_worker = None
+        self.lbl_status.setText("")
+
+    def _on_preview_chunk(self, gen: int, plan: list):
+        if gen != self._preview_gen: return
+        self._preview_seen.update(d["old_path"] for d in plan)
+        with stage(self._preview_prof, "table"):
             self.table.apply_preview_result(plan)
-            self.btn_run.setEnabled(True)
+
+    def _on_preview_failed(self, gen: int, msg: str):
+        if gen != self._preview_gen: return
+        save_error_log("preview", msg); self._toast(f"プレビュー中にエラー: {msg}")
+
+    def _on_preview_done(self, gen: int, count: int, cancelled: bool):
+        if gen != self._preview_gen: return
+        w, self._preview_worker = self._preview_worker, None
+        prof, self._preview_prof = self._preview_prof, None
+        self.lbl_status.setText("")
+        if cancelled: return
+        # 今回の計画に入らなかった行（変化なしになった行）の古いプレビューを消す
+        seen = self._preview_seen
+        with stage(prof, "table"):
+            self.table.apply_preview_result([{"old_path": p, "new_path": ""} for p in self._preview_targets if p not in seen])
             self._apply_selection_filter()
-            if not items: self._toast("変化なし（プレビュー空）")
+        self._preview_targets = []; self._preview_seen = set()
+        self._preview_shown = True
+        self.btn_run.setEnabled(True)
+        empty = "変化なし（プレビュー空）" if not count and not self._preview_quiet else ""
+        self._toast_report(empty, prof, w.captured if w is not None else None)
+
+    def _connect_settings_edits(self):
+        # 設定が変わったら計算中のプレビューは古いので打ち切る（ライブなら計算し直す）
+        # 走査し直しになるもの・表示/実行だけの設定は除く
+        skip = {self.combo_scope, self.cb_sub, self.cb_show_checked_only, self.cb_live_preview, self.cb_watch,
+                self.cb_profile, self.cb_capture, self.spin_workers}
+        for w in self.findChildren(QLineEdit):
+            if not isinstance(w.parent(), QAbstractSpinBox): w.textChanged.connect(self._on_settings_edited)
+        for w in self.findChildren(QComboBox):
+            if w not in skip: w.currentIndexChanged.connect(self._on_settings_edited)
+        for w in self.findChildren(QCheckBox):
+            if w not in skip: w.toggled.connect(self._on_settings_edited)
+        for w in self.findChildren(QSpinBox):
+            if w not in skip: w.valueChanged.connect(self._on_settings_edited)
+
+    def _on_settings_edited(self, *_):
+        if self._preview_worker is not None:
+            self._cancel_preview()
+        self._schedule_live_preview()
+
+    # ===== ライブプレビュー（入力が落ち着いてから計算） =====
+    def _schedule_live_preview(self):
+        if self.cb_live_preview.isChecked():
+            self._live_timer.start()   # 連続入力中は再始動され続ける
+
+    def _live_preview(self):
+        if self._scan_worker is not None: return   # 走査完了時に改めて呼ばれる
+        try:
+            target_paths = self._checked_paths_in_visual_order()
+            if target_paths: self._start_preview(self._entries_for(target_paths), quiet=True)
         except Exception as e:
-            save_error_log("preview", str(e)); self._toast(f"プレビュー中にエラー: {e}")
+            save_error_log("preview", str(e))
 
     def _do_run(self):
+        # 計算中/計算待ちのプレビューがあれば、表のプレビューは今の設定と食い違っている
+        stale = self._preview_worker is not None or self._live_timer.isActive()
+        self._live_timer.stop(); self._cancel_preview()
+        prof = self._new_profile("run")
+        cap = Capture("run") if self._take_capture() else None
         try:
-            checked_paths_ordered = self._checked_paths_in_visual_order()
-            if not checked_paths_ordered: self._toast("チェックされた行がありません。"); return
-
-            rows_for_checked = self.table.rows_for_paths(checked_paths_ordered)
-            missing_calc_paths, items = [], []
-            for r in rows_for_checked:
-                oldp = self.table.item(r, self.table.COL_OLD).text()
-                newp = self.table.item(r, self.table.COL_NEW).text()
-                if newp: items.append(RenameItem(old_path=oldp, new_path=newp))
-                else:    missing_calc_paths.append(oldp)
-
-            if missing_calc_paths:
-                st = self._gather_settings()
-                scope = self._current_scope()
-                if scope == "folder":
-                    items_calc = generate_rename_plan_for_dirs(missing_calc_paths, st, visual_order=True)
-                else:
-                    if st.method == "連番":
-                        items_calc = generate_rename_plan_in_order_per_dir(missing_calc_paths, st) if st.sequence_per_folder else generate_rename_plan_in_order(missing_calc_paths, st)
-                    else:
-                        items_calc = generate_rename_plan(missing_calc_paths, st)
-                self.table.apply_preview_result([{"old_path": it.old_path, "new_path": it.new_path} for it in items_calc])
-                items.extend(items_calc)
-
-            if not items: self._toast("リネーム対象がありません。"); return
+            with cap or nullcontext():
+                results = self._run_checked(stale, prof)
+            if results is None: return
+            msg = "完了：" + self._result_counts(results)
+            self._toast_report(msg, prof, cap.path if cap is not None else None)
+        except Exception as e:
+            save_error_log("run", str(e)); self._toast(f"実行中にエラー: {e}")
+        finally:
+            self._update_undo_button()
+
+    def _run_checked(self, stale: bool, prof: Profile | None) -> RenameResults | None:
+        # チェック行の計画を作って実行する。実行しなかったら None（理由はトースト済み）
+        checked_paths_ordered = self._checked_paths_in_visual_order()
+        if not checked_paths_ordered: self._toast("チェックされた行がありません。"); return None
+
+        rows_for_checked = self.table.rows_for_paths(checked_paths_ordered)
+        missing_calc_paths, plan = [], RenamePlan()
+        for r in rows_for_checked:
+            oldp = self.table.old_path(r)
+            newp = "" if stale else self.table.new_path(r)
+            if newp: plan.append(oldp, newp)
+            else:    missing_calc_paths.append(oldp)
+
+        if missing_calc_paths:
+            missing_calc_paths = self._entries_for(missing_calc_paths)
+            with stage(prof, "plan"):
+                calc = [{"old_path": it.old_path, "new_path": it.new_path}
+                        for it in iter_plan(missing_calc_paths, self._gather_settings(), self._current_scope(), prof=prof)]
+            with stage(prof, "table"):
+                self.table.apply_preview_result(calc)
+            for d in calc: plan.append(d["old_path"], d["new_path"])
+
+        if not len(plan): self._toast("リネーム対象がありません。"); return None
+
+        results = apply_plan(plan, workers=self.spin_workers.value(), journal=self.journal, prof=prof)
+        if results.failed_count: log_failures("rename", results.failures())
+        self._transform_cache.clear()
+        with stage(prof, "table"):
+            self.table.update_status(results)
+            self._roll_forward_rows(results)
+            self._apply_selection_filter()
+        return results
 
-            results = apply_rename(items)
+    def _do_undo(self):
+        self._live_timer.stop(); self._cancel_preview()
+        try:
+            results = self.journal.undo_last(workers=self.spin_workers.value())
+            self._transform_cache.clear()
+            if not results: self._toast("取り消せるリネームがありません。"); return
+            if results.failed_count: log_failures("undo", results.failures())
             self.table.update_status(results)
             self._roll_forward_rows(results)
             self._apply_selection_filter()
+            self._toast("元に戻しました：" + self._result_counts(results))
+        except Exception as e:
+            save_error_log("undo", str(e)); self._toast(f"取り消し中にエラー: {e}")
+        finally:
+            self._update_undo_button()
+
+    @staticmethod
+    def _result_counts(results: RenameResults) -> str:
+        ok = results.ok_count; ng = len(results) - ok
+        text = f"成功 {ok} / 失敗 {ng}"
+        if results.blocked: text += f"（うち事前確認で中止 {results.blocked}）"
+        return text + (f"（{ERROR_LOG_FILE}）" if ng else "")
 
-            ok = sum(1 for r in results if r.get("ok")); ng = len(results) - ok
-            self._toast(f"完了：成功 {ok} / 失敗 {ng}")
+    def _recover_journal(self):
+        try:
+            n = self.journal.recover()
+            if n: self._toast(f"前回中断したリネームを復旧しました（{n} 件）", 5000)
         except Exception as e:
-            save_error_log("run", str(e)); self._toast(f"実行中にエラー: {e}")
+            save_error_log("journal_recover", str(e))
+        self._update_undo_button()
 
-    def _roll_forward_rows(self, results: list[dict]):
-        res_map = {d["old_path"]: d for d in results}
-        for r in range(self.table.rowCount()):
-            oldp = self.table.item(r, self.table.COL_OLD).text()
-            if oldp in res_map and res_map[oldp].get("ok"):
-                newp = res_map[oldp]["new_path"]
-                new_name = os.path.basename(newp)
-                self.table.setItem(r, self.table.COL_BEFORE, QTableWidgetItem(new_name))
-                self.table.setItem(r, self.table.COL_OLD, QTableWidgetItem(newp))
-                self.table.setItem(r, self.table.COL_NEW, QTableWidgetItem(""))
-                self.table.setItem(r, self.table.COL_AFTER, QTableWidgetItem(""))
+    def _update_undo_button(self):
+        try:
+            self.btn_undo.setEnabled(self.journal.can_undo())
+        except Exception as e:
+            save_error_log("journal_read", str(e)); self.btn_undo.setEnabled(False)
+
+    def _roll_forward_rows(self, results: RenameResults):
+        self.table.roll_forward(results)
+        moved = list(results.moved())
+        # 改名後は ctime などが変わりうるので、メタデータは持ち越さず次回必要時に取り直す
+        # 連鎖（a→b, b→c）があるので、旧パスを全部外してから新パスを入れる
+        was_dir = [e.is_dir if (e := self._entry_of.pop(old, None)) is not None else None for old, _ in moved]
+        for (_, new), is_dir in zip(moved, was_dir):
+            if is_dir is not None:
+                self._entry_of[new] = FileEntry(new, is_dir)
+        # 監視中：自分の改名を外部の変更と取り違えないよう、フォルダごとの一覧も進める
+        if self._dir_files:
+            for old, _ in moved:
+                s = self._dir_files.get(os.path.dirname(old))
+                if s is not None: s.discard(old)
+            for _, new in moved:
+                s = self._dir_files.get(os.path.dirname(new))
+                if s is not None: s.add(new)
 
     def _on_list_clear(self):
+        self._live_timer.stop(); self._cancel_preview()
+        self._stop_watch(); self._scanned_dirs = []; self._preview_shown = False
         self.table.clear_rows()
         self.btn_run.setEnabled(False)
         self._toast("一覧をクリアしたよ。")
 
-    # ヘッダクリックソート（安全＋ナチュラル）
+    # ===== フォルダ監視（外部での追加/削除/改名を一覧へ反映） =====
+    def _on_watch_toggled(self, on: bool):
+        if on: self._start_watch()
+        else: self._stop_watch()
+
+    def _start_watch(self):
+        # 対象＝ファイルで、走査が終わっているときだけ。ドロップされた単体ファイルの場所は監視しない
+        if not self.cb_watch.isChecked() or self._current_scope() != "file": return
+        if self._scan_worker is not None or not self._scanned_dirs: return
+        dir_files = {d: set() for d in self._scanned_dirs}
+        dirname = os.path.dirname
+        for p in self._entry_of:
+            s = dir_files.get(dirname(p))
+            if s is not None: s.add(p)
+        self._dir_files = dir_files
+        self.watcher.watch(self._scanned_dirs)
+
+    def _stop_watch(self):
+        self.watcher.stop()
+        self._dir_files = {}
+
+    def _on_watch_dirty(self, dirs: list):
+        if self._scan_worker is not None or not self._dir_files: return
+        try:
+            added, removed = self._watch_delta(dirs)
+            if not added and not removed: return
+            n = 0
+            if removed:
+                for p in removed: self._entry_of.pop(p, None)
+                self.flat_items = [e for e in self.flat_items if e.path not in removed]
+                n = self.table.remove_list_only(removed)
+            if added:
+                self.flat_items.extend(added)
+                self._entry_of.update((e.path, e) for e in added)
+                self.table.append_list_only([e.path for e in added])   # 新しいファイルは末尾へ
+            self.btn_run.setEnabled(self.table.row_count() > 0)
+            self._toast(f"フォルダの変更を反映：追加 {len(added)} / 削除 {n}")
+            # 変わった行だけ計算し直す（変わっていない行は変換キャッシュから返る）
+            if self.cb_live_preview.isChecked(): self._schedule_live_preview()
+            elif self._preview_shown: self._live_preview()
+        except Exception as e:
+            save_error_log("watch", str(e))
+
+    def _watch_delta(self, dirs: list[str]) -> tuple[list[FileEntry], set[str]]:
+        # 変わったフォルダだけ読み直し、一覧との差分（追加 FileEntry / 消えたパス）を返す
+        # 外部での改名は「消えた＋増えた」として扱う
+        sub = self.cb_sub.isChecked()
+        watched = self.watcher.dirs()
+        added: list[FileEntry] = []; removed: set[str] = set()
+        lost: set[str] = set(); new_dirs: list[str] = []
+        for d in dirs:
+            if d not in watched: continue
+            try:
+                found, subdirs = scan_dir(d, sub)
+            except OSError:
+                lost.add(d); continue   # フォルダごと消えた/移動した
+            known = self._dir_files.setdefault(d, set())
+            cur = {e.path: e for e in found}
+            removed.update(p for p in known if p not in cur)
+            fresh = [e for p, e in cur.items() if p not in known]
+            known.difference_update(removed); known.update(e.path for e in fresh)
+            added.extend(fresh)
+            for s in subdirs:
+                if s in watched: continue
+                # 新しいサブフォルダ：中身ごと取り込み、監視に加える
+                nd: list[str] = []
+                for e in iter_collect_entries([s], True, dirs=nd):
+                    added.append(e)
+                    self._dir_files.setdefault(os.path.dirname(e.path), set()).add(e.path)
+                for x in nd: self._dir_files.setdefault(x, set())
+                new_dirs.extend(nd)
+        if lost:
+            prefixes = tuple(x + os.sep for x in lost)
+            lost.update(x for x in watched if x.startswith(prefixes))
+            for x in lost: removed |= self._dir_files.pop(x, set())
+            self.watcher.remove_dirs(lost)
+            self._scanned_dirs = [x for x in self._scanned_dirs if x not in lost]
+        if new_dirs:
+            self.watcher.add_dirs(new_dirs)
+            self._scanned_dirs.extend(new_dirs)
+        return added, removed
+
+    # ヘッダクリックソート（モデル内で行の並びを置換するだけ）
     def _on_header_clicked(self, col: int):
         asc = self._sort_order.get(col, True)
-        snap = []
-        for r in range(self.table.rowCount()):
-            row = {"checked": False, "cells": []}
-            cb = self.table._row_checkbox(r)
-            row["checked"] = bool(cb and cb.isChecked())
-            for c in range(self.table.columnCount()):
-                it = self.table.item(r, c)
-                txt = it.text() if it else ""
-                align = it.textAlignment() if it else (Qt.AlignLeft | Qt.AlignVCenter)
-                row["cells"].append({"text": txt, "align": align})
-            snap.append(row)
-
-        def sort_key(row):
-            if col == self.table.COL_SELECT:
-                return 1 if row["checked"] else 0
-            elif col in (self.table.COL_BEFORE, self.table.COL_AFTER):
-                base = row["cells"][col]["text"]
-                oldp = row["cells"][self.table.COL_OLD]["text"]
-                path_for_key = os.path.join(os.path.dirname(oldp), base) if oldp else base
-                return _natural_key(path_for_key)
-            elif col == self.table.COL_DIR:
-                return [int(t) if t.isdigit() else t.lower() for t in re.split(r'(\d+)', row["cells"][col]["text"])]
-            else:
-                return row["cells"][col]["text"].lower()
-
-        snap.sort(key=sort_key, reverse=not asc)
-
-        self.table.setRowCount(0)
-        from PySide6.QtWidgets import QWidget as _QW, QHBoxLayout as _QHL, QCheckBox as _QCB
-        for row in snap:
-            r = self.table.rowCount(); self.table.insertRow(r)
-            for c, cell in enumerate(row["cells"]):
-                if c == self.table.COL_SELECT:
-                    w = _QW(); lay = _QHL(w); lay.setContentsMargins(0,0,0,0); lay.setAlignment(Qt.AlignCenter)
-                    cb = _QCB(); cb.setChecked(row["checked"]); lay.addWidget(cb)
-                    self.table.setCellWidget(r, c, w)
-                else:
-                    it = QTableWidgetItem(cell["text"]); it.setTextAlignment(cell["align"])
-                    self.table.setItem(r, c, it)
-
+        self.table.source.sort_rows(col, asc)
         self._sort_order[col] = not asc
         self._apply_selection_filter()
 
     def _apply_selection_filter(self):
-        show_checked_only = self.cb_show_checked_only.isChecked()
-        for r in range(self.table.rowCount()):
-            cb = self.table._row_checkbox(r)
-            checked = bool(cb and cb.isChecked())
-            self.table.setRowHidden(r, (show_checked_only and not checked))
+        self.table.set_checked_only(self.cb_show_checked_only.isChecked())
 
     # ===== 保存/復元・フレームレス =====
     def _save_settings(self):
         data = self.cfg.load() or {}
         data.update(self._gather_settings().to_dict())
         data[CFG_KEY_SCOPE] = self._current_scope()
+        data[CFG_KEY_WORKERS] = self.spin_workers.value()
+        data[CFG_KEY_LIVE] = self.cb_live_preview.isChecked()
+        data[CFG_KEY_WATCH] = self.cb_watch.isChecked()
+        data[CFG_KEY_PROFILE] = self.cb_profile.isChecked()
         self.cfg.save(data)
 
     def _restore_settings(self):
@@ -521,6 +836,10 @@ class MainWindow(QWidget):
             self.spin_seq_start.setValue(int(data.get("sequence_start", 1)))
             scope = data.get(CFG_KEY_SCOPE, "file")
             self.combo_scope.setCurrentText(TARGET_FOLDERS if scope == "folder" else TARGET_FILES)
+            self.spin_workers.setValue(int(data.get(CFG_KEY_WORKERS, 1)))
+            self.cb_live_preview.setChecked(bool(data.get(CFG_KEY_LIVE, False)))
+            self.cb_watch.setChecked(bool(data.get(CFG_KEY_WATCH, False)))
+            self.cb_profile.setChecked(bool(data.get(CFG_KEY_PROFILE, False)))
 
             # ▼ move の復元
             self.ed_move_find.setText(data.get("move_find",""))
@@ -558,6 +877,10 @@ class MainWindow(QWidget):
             g = bytes(self.saveGeometry()); data[CFG_KEY_GEOM] = base64.b64encode(g).decode("utf-8")
             h = bytes(self.table.horizontalHeader().saveState()); data[CFG_KEY_HDR]  = base64.b64encode(h).decode("utf-8")
             data.update(self._gather_settings().to_dict()); data[CFG_KEY_SCOPE] = self._current_scope()
+            data[CFG_KEY_WORKERS] = self.spin_workers.value()
+            data[CFG_KEY_LIVE] = self.cb_live_preview.isChecked()
+            data[CFG_KEY_WATCH] = self.cb_watch.isChecked()
+            data[CFG_KEY_PROFILE] = self.cb_profile.isChecked()
             self.cfg.save(data)
         except Exception as e:
             save_error_log("save_window_header", str(e))
@@ -632,8 +955,16 @@ class MainWindow(QWidget):
             self.showMaximized()
 
 
+    def _retire(self, w):
+        # 親（このウィンドウ）が先に壊れると、動いている QThread はプロセスごと落ちる → 止まるまで覚えておく
+        self._retired.add(w)
+        w.finished.connect(lambda w=w: self._retired.discard(w))
+
     def closeEvent(self, ev):
         try:
+            self._live_timer.stop(); self._cancel_scan(silent=True); self._cancel_preview()
+            self._stop_watch()
+            for w in list(self._retired): w.wait()
             self._save_window_and_header()
         finally:
             super().closeEvent(ev)
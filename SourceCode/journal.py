@@ -0,0 +1,178 @@
+import json, os, threading, uuid
+from datetime import datetime
+from processor import RenamePlan, RenameResults, apply_plan
+
+class RenameJournal:
+    """
+    リネーム実行の追記専用ジャーナル（JSONL, 1行1レコード）。
+      begin : バッチ開始（kind = rename / undo, target = 取り消し対象のバッチ）
+      park  : 循環解消で一時名へ退避する「直前」に書く（即 fsync）
+      move  : rename 成功後に書く（OS へは毎回書き出し、fsync はまとめて）
+      end   : バッチ終了
+    途中で落ちても、起動時の recover() が未完了バッチの park / move を逆順にたどって元の名前へ戻す
+    （ロールバック。その操作は rollback 付きの move として記録する）。
+    最後のバッチは undo_last() で取り消せる。
+    """
+    FSYNC_EVERY = 256
+    COMPACT_BYTES = 32 * 1024 * 1024
+
+    def __init__(self, filename: str):
+        self.path = os.path.join(os.getcwd(), filename)
+        self._f = None
+        self._batch: str | None = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self._f is not None
+
+    # ----- 書き込み -----
+    def begin(self, count: int, kind: str = "rename", target: str | None = None, batch: str | None = None):
+        if batch is None and os.path.exists(self.path) and os.path.getsize(self.path) > self.COMPACT_BYTES:
+            self._compact()
+        self._batch = batch or uuid.uuid4().hex
+        self._f = open(self.path, "a", encoding="utf-8")
+        self._write({"op": "begin", "batch": self._batch, "kind": kind, "target": target,
+                     "count": count, "time": datetime.now().isoformat(timespec="seconds")}, sync=True)
+
+    def park(self, orig: str, src: str, tmp: str, final: str):
+        self._write({"op": "park", "orig": orig, "src": src, "tmp": tmp, "final": final}, sync=True)
+
+    def moved(self, orig: str, src: str, dst: str):
+        self._write({"op": "move", "orig": orig, "src": src, "dst": dst})
+
+    def end(self, results: RenameResults | None = None):
+        if self._f is None: return
+        ng = results.failed_count if results is not None else 0
+        self._write({"op": "end", "batch": self._batch, "failed": ng}, sync=True)
+        self.close()
+
+    def close(self):
+        # end なしで閉じる（異常終了時）。書けた分は fsync しておく
+        with self._lock:
+            if self._f is None: return
+            self._f.flush(); os.fsync(self._f.fileno())
+            self._f.close(); self._f = None; self._batch = None; self._pending = 0
+
+    def _write(self, rec: dict, sync: bool = False):
+        with self._lock:
+            if self._f is None: return
+            rec.setdefault("batch", self._batch)
+            self._f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            self._pending += 1
+            self._f.flush()   # プロセスが落ちても記録は残す（fsync は電源断対策）
+            if sync or self._pending >= self.FSYNC_EVERY:
+                os.fsync(self._f.fileno()); self._pending = 0
+
+    def _compact(self):
+        # 取り消しに必要なのは最後のバッチだけ
+        lines = self._read_lines()
+        last = max((i for i, r in enumerate(lines) if r.get("op") == "begin"), default=len(lines))
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for r in lines[last:]:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+            f.flush(); os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    # ----- 読み取り -----
+    def _read_lines(self) -> list[dict]:
+        if not os.path.exists(self.path): return []
+        out = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    out.append(json.loads(line))
+                except ValueError:
+                    continue  # 書き込み途中で落ちた最終行など
+        return out
+
+    def _batches(self) -> list[dict]:
+        batches: dict[str, dict] = {}
+        for r in self._read_lines():
+            b = batches.get(r.get("batch"))
+            if r["op"] == "begin":
+                if b is None:
+                    b = batches[r["batch"]] = {"batch": r["batch"], "kind": r.get("kind", "rename"),
+                                               "target": r.get("target"), "ended": False, "parks": [], "moves": [],
+                                               "steps": [], "undone_steps": set(), "rolled_back": False}
+                else:
+                    b["ended"] = False  # recover() による再開
+            elif b is None:
+                continue
+            elif r.get("rollback") is not None:
+                # recover() が戻した操作（steps の番号）
+                b["rolled_back"] = True
+                b["undone_steps"].add(r["rollback"])
+            elif r["op"] == "park":
+                b["parks"].append(r); b["steps"].append(r)
+            elif r["op"] == "move":
+                b["moves"].append(r); b["steps"].append(r)
+            elif r["op"] == "end":
+                b["ended"] = True
+                t = batches.get(b["target"]) if b["kind"] == "undo" and not b["rolled_back"] else None
+                if t is not None: t["undone"] = True
+        return list(batches.values())
+
+    # ----- 起動時の復旧 -----
+    def recover(self) -> int:
+        """
+        未完了バッチをロールバックする（記録された操作を新しい順に戻す）。戻した件数を返す。
+        - move は dst → src、park は 一時名 → 元の名前
+        - 戻し先が埋まっている・戻し元が無い操作は飛ばす（別名は作らない。一時名のまま残る）
+        - 途中で落ちても、再度の recover() は戻し済みの操作を飛ばして続きから戻す
+        """
+        batches = self._batches()
+        if not batches or batches[-1]["ended"]:
+            return 0
+        last = batches[-1]
+        self.begin(0, kind=last["kind"], target=last["target"], batch=last["batch"])
+        fixed = 0
+        try:
+            for n in range(len(last["steps"]) - 1, -1, -1):
+                if n in last["undone_steps"]: continue
+                r = last["steps"][n]
+                cur, back = (r["tmp"], r["src"]) if r["op"] == "park" else (r["dst"], r["src"])
+                if cur == back or not os.path.lexists(cur) or os.path.lexists(back): continue
+                try:
+                    os.rename(cur, back)
+                except OSError:
+                    continue
+                self._write({"op": "move", "orig": r["orig"], "src": cur, "dst": back, "rollback": n})
+                fixed += 1
+        except BaseException:
+            self.close()   # end を書かない → 次回の recover() が続きから戻す
+            raise
+        self.end()
+        return fixed
+
+    # ----- 取り消し -----
+    def _undo_target(self) -> dict | None:
+        # ロールバック済みのバッチ（何も変わっていない）は飛ばして、その前のバッチを見る
+        last = next((b for b in reversed(self._batches()) if not b["rolled_back"]), None)
+        if last is None or last["kind"] != "rename" or not last["ended"] or last.get("undone") or not last["moves"]:
+            return None
+        return last
+
+    def can_undo(self) -> bool:
+        return self._undo_target() is not None
+
+    def undo_last(self, workers: int = 1) -> RenameResults:
+        """直前のリネームを取り消す（現在の名前 → 元の名前）。結果は apply_plan と同じ形。"""
+        last = self._undo_target()
+        if last is None: return RenameResults(RenamePlan())
+        where: dict[str, str] = {}
+        for m in last["moves"]:
+            where[m["orig"]] = m["dst"]
+        plan = RenamePlan()
+        for orig, now in where.items():
+            if now != orig and os.path.lexists(now): plan.append(now, orig)
+        self.begin(len(plan), kind="undo", target=last["batch"])
+        try:
+            results = apply_plan(plan, workers=workers, journal=self)
+        except BaseException:
+            self.close()
+            raise
+        self.end(results)
+        return results
@@ -0,0 +1,89 @@
+import os, sqlite3, time
+
+class ListingCache:
+    """
+    ディレクトリ一覧のディスクキャッシュ（SQLite, 設定ファイルと同じ場所）。
+    キーはディレクトリのパス＋ディレクトリの mtime。中身が増減・改名されると mtime が変わるので、
+    変わっていないディレクトリは scandir せずに名前だけ返す（stat 1回で済む）。
+    保存するのは名前と種類だけ（サイズ/日付は持たない → 古い日付で改名しない）。
+    """
+    MAX_DIRS = 2_000_000   # これを超えたら作り直す
+    RACY_SEC = 2.0         # mtime が新しすぎるディレクトリは保存しない（同じ時刻内の追加を取りこぼさない）
+
+    def __init__(self, filename: str):
+        self.path = os.path.join(os.getcwd(), filename)
+
+    def session(self) -> "_ListingSession":
+        # sqlite3 の接続はスレッドをまたげないので、走査ごと（＝ワーカーのスレッド内）で開く
+        return _ListingSession(self.path, self.MAX_DIRS, self.RACY_SEC)
+
+    def clear(self):
+        with self.session() as s:
+            s.clear()
+
+class _ListingSession:
+    FLUSH_EVERY = 1000
+
+    def __init__(self, path: str, max_dirs: int, racy_sec: float):
+        self._path, self._max_dirs, self._racy_sec = path, max_dirs, racy_sec
+        self._db: sqlite3.Connection | None = None
+        self._pending: list[tuple] = []
+
+    def __enter__(self):
+        try:
+            self._db = sqlite3.connect(self._path, timeout=5)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, mtime INTEGER NOT NULL,"
+                             " files TEXT NOT NULL, others TEXT NOT NULL, subdirs TEXT NOT NULL)")
+            n = self._db.execute("SELECT COUNT(*) FROM dirs").fetchone()[0]
+            if n > self._max_dirs:
+                self.clear()
+        except sqlite3.Error:
+            self._close()   # キャッシュが使えなくても走査はそのまま続ける
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            self._flush()
+        finally:
+            self._close()
+        return False
+
+    def _close(self):
+        if self._db is not None:
+            try: self._db.close()
+            except sqlite3.Error: pass
+        self._db = None
+
+    def clear(self):
+        if self._db is None: return
+        self._db.execute("DELETE FROM dirs"); self._db.commit()
+
+    def get(self, d: str, mtime_ns: int) -> tuple[list[str], list[str], list[str]] | None:
+        """一覧が変わっていなければ (files, others, subdirs) の名前を返す。無ければ None"""
+        if self._db is None: return None
+        try:
+            row = self._db.execute("SELECT mtime, files, others, subdirs FROM dirs WHERE path=?", (d,)).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None or row[0] != mtime_ns:
+            return None
+        return tuple(v.split("\0") if v else [] for v in row[1:])
+
+    def put(self, d: str, mtime_ns: int, files: list[str], others: list[str], subdirs: list[str]):
+        if self._db is None: return
+        if time.time() - mtime_ns / 1e9 < self._racy_sec:
+            return
+        self._pending.append((d, mtime_ns, "\0".join(files), "\0".join(others), "\0".join(subdirs)))
+        if len(self._pending) >= self.FLUSH_EVERY:
+            self._flush()
+
+    def _flush(self):
+        if self._db is None or not self._pending: return
+        try:
+            self._db.executemany("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?, ?)", self._pending)
+            self._db.commit()
+        except sqlite3.Error:
+            pass
+        self._pending = []
@@ -1,8 +1,18 @@
+import errno
 import os
 import re
+import threading
+import time
 import uuid
-from dataclasses import dataclass, asdict
+from array import array
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, asdict, astuple, fields
 from datetime import datetime
+from utils import path_sort_key
+from profiling import stage
 
 @dataclass
 class Settings:
@@ -41,33 +51,263 @@ class Settings:
 
     def to_dict(self): return asdict(self)
 
-@dataclass
+    @classmethod
+    def from_dict(cls, data: dict) -> "Settings":
+        # 設定ファイル（ウィンドウ位置なども混在）から Settings の項目だけを拾う
+        names = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in names})
+
+@dataclass(slots=True)
 class RenameItem:
     old_path: str
     new_path: str
 
+_SEPS = "\\/" if os.name == "nt" else "/"
+
+def _split_prefix(path: str) -> tuple[str, str]:
+    # (最後の区切りまで, 名前)。足せば元のパスに戻る（正規化しない）
+    i = max(path.rfind(c) for c in _SEPS)
+    if i < 0 and path[1:2] == ":" and os.name == "nt": i = 1   # "C:name"
+    return path[:i + 1], path[i + 1:]
+
+class RenamePlan:
+    """
+    リネーム計画の列指向ストア（RenameItem を1件ずつ持たない）。
+    ディレクトリ部分は共有し、各項目は「ディレクトリ番号＋名前」だけを持つ。
+    [i] / 反復では RenameItem をその場で作って返す（従来の list[RenameItem] と同じように使える）
+    """
+    __slots__ = ("dirs", "_dir_ix", "_dirname", "_old_dir", "_old_name", "_new_dir", "_new_name")
+
+    def __init__(self, items: Iterable[RenameItem] = ()):
+        self.dirs: list[str] = []            # 末尾の区切りまで含むディレクトリ部分
+        self._dir_ix: dict[str, int] = {}
+        self._dirname: list[str] = []        # dirs[k] の os.path.dirname（項目の親ディレクトリ）
+        self._old_dir = array("I"); self._old_name: list[str] = []
+        self._new_dir = array("I"); self._new_name: list[str] = []
+        for it in items:
+            self.append(it.old_path, it.new_path)
+
+    def _intern(self, prefix: str) -> int:
+        k = self._dir_ix.get(prefix)
+        if k is None:
+            k = self._dir_ix[prefix] = len(self.dirs)
+            self.dirs.append(prefix); self._dirname.append(os.path.dirname(prefix))
+        return k
+
+    def append(self, old_path: str, new_path: str):
+        d, n = _split_prefix(old_path)
+        self._old_dir.append(self._intern(d)); self._old_name.append(n)
+        d, n = _split_prefix(new_path)
+        self._new_dir.append(self._intern(d)); self._new_name.append(n)
+
+    def __len__(self) -> int:
+        return len(self._old_name)
+
+    def __getitem__(self, i: int) -> RenameItem:
+        return RenameItem(self.old_path(i), self.new_path(i))
+
+    def __iter__(self) -> Iterator[RenameItem]:
+        return map(self.__getitem__, range(len(self)))
+
+    def old_path(self, i: int) -> str: return self.dirs[self._old_dir[i]] + self._old_name[i]
+    def new_path(self, i: int) -> str: return self.dirs[self._new_dir[i]] + self._new_name[i]
+    def new_name(self, i: int) -> str: return self._new_name[i]
+    def old_dir(self, i: int) -> str: return self._dirname[self._old_dir[i]]
+    def new_dir(self, i: int) -> str: return self._dirname[self._new_dir[i]]
+
+_RESULT_OK, _RESULT_NG = 1, 2
+
+class RenameResults:
+    """
+    apply_plan の結果。状態は1件1byte、最終パスは計画と違う項目だけ、エラー（と errno）は失敗した項目だけ持つ。
+    [i] / 反復では従来どおりの dict（old_path / new_path / ok / error）をその場で作って返す。
+    """
+    __slots__ = ("plan", "status", "_final", "_error", "_errno", "blocked")
+
+    def __init__(self, plan: RenamePlan):
+        self.plan = plan
+        self.status = bytearray(len(plan))   # 0=未処理 / 1=成功 / 2=失敗
+        self._final: dict[int, str] = {}
+        self._error: dict[int, str] = {}
+        self._errno: dict[int, int] = {}
+        self.blocked = 0   # 失敗のうち、事前確認で実行しなかった件数
+
+    def record(self, i: int, ok: bool, path: str, err: str | None = None, errno: int | None = None):
+        self.status[i] = _RESULT_OK if ok else _RESULT_NG
+        if path != self.plan.new_path(i): self._final[i] = path
+        if err is not None: self._error[i] = err
+        if errno is not None: self._errno[i] = errno
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+    def ok(self, i: int) -> bool: return self.status[i] == _RESULT_OK
+    def old_path(self, i: int) -> str: return self.plan.old_path(i)
+    def new_path(self, i: int) -> str: return self._final.get(i) or self.plan.new_path(i)
+    def error(self, i: int) -> str | None: return self._error.get(i)
+
+    @property
+    def ok_count(self) -> int:
+        return self.status.count(_RESULT_OK)
+
+    @property
+    def failed_count(self) -> int:
+        return len(self.status) - self.ok_count
+
+    def failures(self) -> Iterator[tuple[str, int | None, str]]:
+        # 失敗した (old_path, errno, エラー)。エラーログへまとめて書く用
+        for i in self.status_rows(_RESULT_NG):
+            yield self.old_path(i), self._errno.get(i), self._error.get(i, "")
+
+    def moved(self) -> Iterator[tuple[str, str]]:
+        # 成功した (old_path, new_path)
+        for i in self.status_rows(_RESULT_OK):
+            yield self.old_path(i), self.new_path(i)
+
+    def status_rows(self, code: int) -> Iterator[int]:
+        st = self.status
+        i = st.find(code)
+        while i >= 0:
+            yield i
+            i = st.find(code, i + 1)
+
+    def __getitem__(self, i: int) -> dict:
+        return {"old_path": self.old_path(i), "new_path": self.new_path(i), "ok": self.ok(i), "error": self.error(i)}
+
+    def __iter__(self) -> Iterator[dict]:
+        return map(self.__getitem__, range(len(self)))
+
+    def to_dicts(self) -> list[dict]:
+        return list(self)
+
 # ---------- 収集 ----------
+# Windows の DirEntry.stat() はディレクトリ読み取り時の情報をそのまま返す（追加のsyscallなし）。
+# POSIX では1ファイル1回の stat になるため、必要になるまで（日付モード）遅延させる。
+_STAT_IS_FREE = os.name == "nt"
+
+@dataclass(frozen=True, slots=True)
+class FileEntry:
+    # 走査時に1回だけ取得したメタデータ。None は「未取得（必要時に stat）」
+    path: str
+    is_dir: bool = False
+    size: int | None = None
+    mtime: float | None = None
+    ctime: float | None = None
+
+def _entry_from_dirent(e: os.DirEntry, is_dir: bool = False) -> FileEntry:
+    if not _STAT_IS_FREE:
+        return FileEntry(e.path, is_dir)
+    try:
+        s = e.stat()
+    except OSError:
+        return FileEntry(e.path, is_dir)
+    return FileEntry(e.path, is_dir, s.st_size, s.st_mtime, s.st_ctime)
+
+def _as_entry(p: "str | FileEntry") -> FileEntry:
+    return p if isinstance(p, FileEntry) else FileEntry(p)
+
+def _path_of(p: "str | FileEntry") -> str:
+    return p.path if isinstance(p, FileEntry) else p
+
+def _entry_time(e: FileEntry, created: bool) -> float:
+    ts = e.ctime if created else e.mtime
+    if ts is None:
+        s = os.stat(e.path)
+        ts = s.st_ctime if created else s.st_mtime
+    return ts
+
+def scan_dir(top: str, include_subfolders: bool, listing=None, prof=None) -> tuple[list[FileEntry], list[str]]:
+    """
+    1ディレクトリ分の走査：(対象ファイル, 潜るサブフォルダ)。読めなければ OSError。
+    対象は os.walk（再帰あり）/ os.listdir+isfile（再帰なし）と同じ。
+    listing: 一覧キャッシュのセッション（listing_cache）。mtime が同じディレクトリは scandir しない
+    prof: profiling.Profile（省略可）。stat / scandir の回数を数える
+    """
+    join = os.path.join
+    if listing is not None:
+        mtime = os.stat(top).st_mtime_ns
+        if prof is not None: prof.count("sys.stat")
+        hit = listing.get(top, mtime)
+        if hit is not None:
+            files, others, subdirs = hit
+            found = [FileEntry(join(top, n)) for n in files]
+            if not include_subfolders:
+                return found, []
+            found.extend(FileEntry(join(top, n)) for n in others)
+            return found, [join(top, n) for n in subdirs]
+        # キャッシュ用に種類ごとの名前も控える（再帰あり/なしどちらの走査にも使えるように）
+        names: tuple[list[str], list[str], list[str]] = ([], [], [])
+    found: list[FileEntry] = []
+    subdirs: list[str] = []
+    if prof is not None: prof.count("sys.scandir")
+    with os.scandir(top) as it:
+        for e in it:
+            try:
+                is_dir = e.is_dir()
+            except OSError:
+                is_dir = False
+            if listing is not None:
+                if is_dir:
+                    if not e.is_symlink(): names[2].append(e.name)
+                else:
+                    try:
+                        is_file = e.is_file()
+                    except OSError:
+                        is_file = False
+                    names[0 if is_file else 1].append(e.name)
+            if include_subfolders:
+                if is_dir:
+                    if not e.is_symlink(): subdirs.append(e.path)
+                    continue
+            elif not e.is_file():
+                continue
+            found.append(_entry_from_dirent(e))
+    if listing is not None:
+        listing.put(top, mtime, *names)
+    return found, subdirs
+
+def _iter_files_in_folder(folder: str, include_subfolders: bool, listing=None, dirs=None, prof=None) -> Iterator[FileEntry]:
+    # 1ディレクトリ1回の scandir で深さ優先に列挙（os.walk と同じ順にたどる）
+    # dirs: 渡すと、読めたディレクトリを追記する（フォルダ監視用）
+    stack = [folder]
+    while stack:
+        top = stack.pop()
+        try:
+            found, subdirs = scan_dir(top, include_subfolders, listing, prof)
+        except OSError:
+            if not include_subfolders: raise
+            continue  # os.walk 同様、読めないサブフォルダは飛ばす
+        if dirs is not None: dirs.append(top)
+        yield from found
+        stack.extend(reversed(subdirs))
+
 def _files_in_folder(folder: str, include_subfolders: bool) -> list[str]:
-    out = []
-    if include_subfolders:
-        for r, _, files in os.walk(folder):
-            for f in files:
-                out.append(os.path.join(r, f))
-    else:
-        for f in os.listdir(folder):
-            p = os.path.join(folder, f)
-            if os.path.isfile(p):
-                out.append(p)
-    return out
+    return [e.path for e in _iter_files_in_folder(folder, include_subfolders)]
 
-def _collect_paths(paths: list[str], include_subfolders: bool) -> list[str]:
-    all_files = []
+def iter_collect_entries(paths: list["str | FileEntry"], include_subfolders: bool,
+                         listing=None, dirs=None, prof=None) -> Iterator[FileEntry]:
+    # 見つけた順にそのまま流す（並べ替えは呼び出し側）。バックグラウンド走査用
     for p in paths:
-        if os.path.isdir(p):
-            all_files.extend(_files_in_folder(p, include_subfolders))
+        if isinstance(p, FileEntry):
+            if p.is_dir:
+                yield from _iter_files_in_folder(p.path, include_subfolders, listing, dirs, prof)
+            else:
+                yield p  # 走査済みのファイルは再確認しない
+        elif os.path.isdir(p):
+            yield from _iter_files_in_folder(p, include_subfolders, listing, dirs, prof)
         elif os.path.isfile(p):
-            all_files.append(p)
-    return sorted(all_files)
+            yield FileEntry(p)
+
+def iter_collect_paths(paths: list[str], include_subfolders: bool) -> Iterator[str]:
+    for e in iter_collect_entries(paths, include_subfolders):
+        yield e.path
+
+def _collect_entries(paths: list["str | FileEntry"], include_subfolders: bool) -> list[FileEntry]:
+    # 並びはフォルダごとの自然順（GUI の一覧・連番の既定の順と同じ）
+    return sorted(iter_collect_entries(paths, include_subfolders), key=lambda e: path_sort_key(e.path))
+
+def _collect_paths(paths: list[str], include_subfolders: bool) -> list[str]:
+    return sorted(iter_collect_paths(paths, include_subfolders), key=path_sort_key)
 
 def _add_folder_name(path: str, name: str, pos: str, include_parent: bool) -> str:
     folder = os.path.basename(os.path.dirname(path))
@@ -76,10 +316,6 @@ def _add_folder_name(path: str, name: str, pos: str, include_parent: bool) -> st
         folder = f"{parent}_{folder}"
     return f"{folder}_{name}" if pos == "前に追加" else f"{name}_{folder}"
 
-def _splitext_keepdot(fullname: str):
-    base, ext = os.path.splitext(fullname)
-    return base, ext
-
 def _clean_separators(text: str) -> str:
     t = text.replace("  ", " ").replace("__", "_")
     return t.strip(" _")
@@ -91,254 +327,675 @@ def _maybe_sep(sep_mode: str) -> str:
     return ""
 
 # ---------- 変換コア ----------
-def _transform_name(path: str, name: str, ext: str, st: Settings, counter: int) -> str:
-    # 全モードの名称変換をここで集約。変更なしは "" を返してスキップ。
-    original_full = f"{name}{ext}"
-    new_name, new_ext = name, ext
-
-    # --- 置換 ---
-    if st.method.startswith("リネーム"):
-        if st.include_extension:
-            full = f"{new_name}{new_ext}"
-            if st.target:
-                full = full.replace(st.target, st.replacement)
-            if st.rename_second_active and st.target_second:
-                full = full.replace(st.target_second, st.replacement_second)
-            new_name, new_ext = _splitext_keepdot(full)
-        else:
-            if st.target and st.target in new_name:
-                new_name = new_name.replace(st.target, st.replacement)
-            if st.rename_second_active and st.target_second and st.target_second in new_name:
-                new_name = new_name.replace(st.target_second, st.replacement_second)
-
-    # --- エリア文字削除 ---
-    elif st.method.startswith("エリア文字削除"):
-        if st.surrounded_start:
-            s = new_name.find(st.surrounded_start)
-            if s != -1:
-                e = new_name.find(st.surrounded_end, s + len(st.surrounded_start)) if st.surrounded_end else -1
-                if e != -1:
-                    new_name = new_name[:s] + new_name[e + len(st.surrounded_end):]
-
-    # --- 連番 ---
-    elif st.method == "連番":
-        digits = max(1, int(st.sequence_digits))
-        seq = str(counter).zfill(digits)
-        mode = st.sequence_mode
-        if mode == "フルリネーム":
-            new_name = seq
-        elif mode == "前に追加":
-            new_name = f"{seq}_{new_name}"
-        else:  # 後に追加
-            new_name = f"{new_name}_{seq}"
-
-    # --- 日付 ---
-    elif st.method == "日付":
-        ts = os.path.getctime(path) if st.date_type == "作成日" else os.path.getmtime(path)
-        tag = "[DateCreated]" if st.date_type == "作成日" else "[DateUpdated]"
-        d = datetime.fromtimestamp(ts).strftime("%Y_%m_%d-%H_%M_%S")
-        ds = f"{tag}{d}"
-        mode = st.date_mode
-        if mode == "フルリネーム":
-            new_name = ds
-        elif mode == "前に追加":
-            new_name = f"{ds}_{new_name}"
-        else:
-            new_name = f"{new_name}_{ds}"
+# Settings を1回だけ解釈して「1ファイル分の変換関数」に組み立てる。
+# 各 _compile_* は core(path, name, ext, counter, entry) -> 新しいファイル名 | None を返す
+# （None = 変化なし/スキップ）。モード分岐・区切り・正規表現のコンパイルはここで1回だけ。
+NameCore = Callable[[str, str, str, int, "FileEntry | None"], "str | None"]
+Transform = Callable[..., str]
+
+def _compile_replace(st: Settings) -> NameCore | None:
+    t1, r1 = st.target, st.replacement
+    t2, r2 = (st.target_second, st.replacement_second) if st.rename_second_active else ("", "")
+    if not t1 and not t2:
+        return None
+    if st.include_extension:
+        def core(path, name, ext, counter, entry):
+            full = f"{name}{ext}"
+            if t1: full = full.replace(t1, r1)
+            if t2: full = full.replace(t2, r2)
+            return full
+    else:
+        def core(path, name, ext, counter, entry):
+            # どちらの検索語も含まない名前は置換処理そのものを省く（大半の行はここで抜ける）
+            if (not t1 or t1 not in name) and (not t2 or t2 not in name): return None
+            if t1: name = name.replace(t1, r1)
+            if t2: name = name.replace(t2, r2)
+            return f"{name}{ext}"
+    return core
+
+def _compile_area(st: Settings) -> NameCore | None:
+    s0, e0 = st.surrounded_start, st.surrounded_end
+    if not s0 or not e0:
+        return None  # 終了文字が無ければ従来どおり削除しない
+    n0 = len(s0); m0 = len(e0)
+    def core(path, name, ext, counter, entry):
+        s = name.find(s0)
+        if s == -1: return None
+        e = name.find(e0, s + n0)
+        if e == -1: return None
+        return f"{name[:s]}{name[e + m0:]}{ext}"
+    return core
+
+def _compile_sequence(st: Settings) -> NameCore:
+    digits = max(1, int(st.sequence_digits))
+    mode = st.sequence_mode
+    if mode == "フルリネーム":
+        return lambda path, name, ext, counter, entry: f"{str(counter).zfill(digits)}{ext}"
+    if mode == "前に追加":
+        return lambda path, name, ext, counter, entry: f"{str(counter).zfill(digits)}_{name}{ext}"
+    return lambda path, name, ext, counter, entry: f"{name}_{str(counter).zfill(digits)}{ext}"
+
+def _compile_date(st: Settings) -> NameCore:
+    created = st.date_type == "作成日"
+    tag = "[DateCreated]" if created else "[DateUpdated]"
+    mode = st.date_mode
+    def core(path, name, ext, counter, entry):
+        ts = _entry_time(entry or FileEntry(path), created)
+        ds = f"{tag}{datetime.fromtimestamp(ts).strftime('%Y_%m_%d-%H_%M_%S')}"
+        if mode == "フルリネーム": return f"{ds}{ext}"
+        if mode == "前に追加": return f"{ds}_{name}{ext}"
+        return f"{name}_{ds}{ext}"
+    return core
+
+def _compile_add_text(st: Settings) -> NameCore | None:
+    add = st.add_text
+    if not add:
+        return None
+    if st.text_position == "先頭に追加":
+        return lambda path, name, ext, counter, entry: f"{add}{name}{ext}"
+    return lambda path, name, ext, counter, entry: f"{name}{add}{ext}"
 
-    # --- 文字列追加（先頭/最後） ---
-    elif st.method == "文字列追加":
-        new_name = f"{st.add_text}{new_name}" if st.text_position == "先頭に追加" else f"{new_name}{st.add_text}"
+def _compile_folder_name(st: Settings) -> NameCore:
+    pos, include_parent = st.folder_name_position, st.include_parent_folder
+    return lambda path, name, ext, counter, entry: f"{_add_folder_name(path, name, pos, include_parent)}{ext}"
 
-    # --- フォルダ名追加 ---
-    elif st.method == "フォルダ名追加":
-        new_name = _add_folder_name(path, new_name, st.folder_name_position, st.include_parent_folder)
+def _compile_move(st: Settings) -> NameCore | None:
+    find = st.move_find or ""
+    use_find, regex = st.move_use_find, st.move_regex
+    find_re = re.compile(find) if (regex and find) else None
+    custom = st.move_custom or ""
+    delete_mode = st.move_action == "元の文字列を削除して移動"
+    delete_all = st.move_delete_all
+    sep = _maybe_sep(st.move_sep_mode)
+    anchor_mode = st.move_pos not in ("頭に追加", "後ろに追加")
+    at_head = st.move_pos == "頭に追加"
+    anchor = st.move_anchor or ""
+    anchor_re = re.compile(anchor) if (st.move_anchor_regex and anchor) else None
 
-    # --- 特定文字の移動/追加（正規表現・全部削除・区切り・アンカー対応） ---
-    elif st.method == "特定文字の移動/追加":
-        base = new_name
-        find = (st.move_find or "")
+    # 設定だけで「全件スキップ」が確定するケース
+    if use_find and not find: return None          # 検索語なし
+    if not use_find and not custom: return None    # 追加文字が空
+    if anchor_mode and not anchor: return None     # アンカー未指定
+    if not anchor_mode and delete_mode and not find: return None  # 検索語未指定で削除は不可
+
+    def found(base: str) -> bool:
+        return bool(find_re.search(base)) if regex else (find in base)
+
+    def remove(base: str) -> str:
+        if regex:
+            return find_re.sub("", base, count=0 if delete_all else 1)
+        return base.replace(find, "") if delete_all else base.replace(find, "", 1)
+
+    def core(path, name, ext, counter, entry):
+        base = name
 
         # 1) 追加テキストの決定（検索語を使う or 自由入力）
-        if st.move_use_find:
-            if st.move_regex:
-                m = re.search(find, base) if find else None
-                if not m:
-                    return ""  # 検索語が見つからない→スキップ
+        if use_find:
+            if regex:
+                m = find_re.search(base)
+                if not m: return None
                 ins = m.group(0)
-                find_matched = True
             else:
-                if not find or (find not in base):
-                    return ""  # 見つからない→スキップ
+                if find not in base: return None
                 ins = find
-                find_matched = True
         else:
-            # 自由入力：挿入文字
-            ins = st.move_custom or ""
-            if not ins:
-                return ""  # 追加文字が空→スキップ
+            ins = custom
             # 自由入力でも、find が指定されている場合は一致必須
-            if find:
-                find_matched = bool(re.search(find, base) if st.move_regex else (find in base))
-                if not find_matched:
-                    return ""  # 見つからない→スキップ
-            else:
-                find_matched = False  # find 未指定
+            if find and not found(base): return None
 
         # 2) 位置分岐
-        pos = st.move_pos  # "頭に追加" / "後ろに追加" / （拡張）"指定文字の後に追加"
-        sep = _maybe_sep(st.move_sep_mode)
-
-        # --- (A) 指定文字の後に追加（アンカー） ---
-        if pos not in ("頭に追加", "後ろに追加"):
-            anchor = getattr(st, "move_anchor", "") or ""
-            use_anchor_regex = bool(getattr(st, "move_anchor_regex", False))
-            if not anchor:
-                return ""  # アンカー未指定→スキップ
-
-            # アンカー検索（最初の一致のみ）
-            if use_anchor_regex:
-                am = re.search(anchor, base)
-                if not am:
-                    return ""  # 見つからない→スキップ
+        if anchor_mode:
+            # アンカー検索（最初の一致のみ）。位置は削除前の文字列で決める（従来互換）
+            if anchor_re is not None:
+                am = anchor_re.search(base)
+                if not am: return None
                 idx = am.end()
             else:
                 idx = base.find(anchor)
-                if idx == -1:
-                    return ""  # 見つからない→スキップ
+                if idx == -1: return None
                 idx += len(anchor)
-
-            # （任意）移動モードなら "find" を削除
-            if st.move_action == "元の文字列を削除して移動" and find:
-                if st.move_regex:
-                    base = re.sub(find, "", base, count=0 if st.move_delete_all else 1) if re.search(find, base) else base
-                else:
-                    if find in base:
-                        base = base.replace(find, "") if st.move_delete_all else base.replace(find, "", 1)
-
+            if delete_mode and find and found(base):
+                base = remove(base)
             left, right = base[:idx], base[idx:]
             mid = (sep if (left and ins and sep) else "")
             new_name = f"{left}{mid}{ins}{right}"
-
-        # --- (B) 頭/後ろ に追加 ---
         else:
-            # 「削除して移動」のときは必ず検索語が存在していること
-            if st.move_action == "元の文字列を削除して移動":
-                if not find:
-                    return ""  # 検索語未指定で削除は不可
-                # ここまで来たら find_matched は必須で True のはずだが、念のため確認
-                if not (re.search(find, base) if st.move_regex else (find in base)):
-                    return ""  # 見つからない→スキップ
-                if st.move_regex:
-                    base = re.sub(find, "", base, count=0 if st.move_delete_all else 1)
-                else:
-                    base = base.replace(find, "") if st.move_delete_all else base.replace(find, "", 1)
-            else:
-                # 「元の文字列はそのまま追加」でも、検索語を使う設定なら一致必須
-                if st.move_use_find and not find_matched:
-                    return ""  # 見つからない→スキップ
-
-            if pos == "頭に追加":
+            if delete_mode:
+                if not found(base): return None
+                base = remove(base)
+            if at_head:
                 new_name = f"{ins}{sep}{base}" if (base and ins and sep) else f"{ins}{base}"
-            else:  # 後ろに追加
+            else:
                 new_name = f"{base}{sep}{ins}" if (base and ins and sep) else f"{base}{ins}"
 
-        # 仕上げクリーン
-        new_name = _clean_separators(new_name)
+        return f"{_clean_separators(new_name)}{ext}"
+    return core
 
-    # === 変更なしならスキップ ===
-    if f"{new_name}{new_ext}" == original_full:
-        return ""
-    return os.path.join(os.path.dirname(path), f"{new_name}{new_ext}")
+def compile_transform(st: Settings) -> Transform:
+    """
+    Settings → 変換関数 fn(path, name, ext, counter, entry=None) -> 新しいフルパス。
+    変更なしは "" を返してスキップ。プレビュー/実行ごとに1回だけ呼ぶ。
+    """
+    m = st.method
+    if m.startswith("リネーム"): core = _compile_replace(st)
+    elif m.startswith("エリア文字削除"): core = _compile_area(st)
+    elif m == "連番": core = _compile_sequence(st)
+    elif m == "日付": core = _compile_date(st)
+    elif m == "文字列追加": core = _compile_add_text(st)
+    elif m == "フォルダ名追加": core = _compile_folder_name(st)
+    elif m == "特定文字の移動/追加": core = _compile_move(st)
+    else: core = None
 
+    if core is None:
+        return lambda path, name, ext, counter, entry=None: ""
 
-def _transform_dirname(path: str, st: Settings, counter: int) -> str:
-    d = os.path.dirname(path)
-    name = os.path.basename(path)
-    ext = ""
-    return _transform_name(path, name, ext, st, counter)
+    join, dirname = os.path.join, os.path.dirname
+    def transform(path: str, name: str, ext: str, counter: int, entry: FileEntry | None = None) -> str:
+        new_full = core(path, name, ext, counter, entry)
+        # === 変更なしならスキップ ===
+        if new_full is None or new_full == f"{name}{ext}":
+            return ""
+        return join(dirname(path), new_full)
+    return transform
+
+def compile_prefilter(st: Settings) -> Callable[[str], bool] | None:
+    """
+    パス文字列だけで「変わりえない」行を落とす安い判定（名前の分解より前に使う）。
+    False を返した行は変換しない。None なら全行を変換する。
+    置換：検索語をどれも含まないパスは置換しても変わらない（フォルダ部分に含むだけなら素通しで変換へ）
+    """
+    if not st.method.startswith("リネーム"):
+        return None
+    terms = [t for t in (st.target, st.target_second if st.rename_second_active else "") if t]
+    if not terms:
+        return lambda path: False
+    if len(terms) == 1:
+        t1 = terms[0]
+        return lambda path: t1 in path
+    t1, t2 = terms
+    return lambda path: t1 in path or t2 in path
+
+# ---------- 一括変換 ----------
+# 置換 / 文字列追加 / 連番 / フォルダ名追加 は、名前の列にまとめて同じ文字列操作をかけるだけで済む。
+# 1件ずつの関数呼び出し・os.path.join/dirname をやめ、ブロック単位の内包表記で新しい名前を作る。
+# 純 Python のままなので、速くなるのは呼び出しの手間の分だけ（100万件で 1件ずつ版の約2〜3.5倍。ベクトル化ほどではない）
+# batch(prefixes, names, exts, counters) -> 新しいファイル名（拡張子込み）のリスト。None = 変化なし
+BatchCore = Callable[[list[str], list[str], list[str], list[int]], list["str | None"]]
+
+_BATCH = 4096   # 1ブロックの件数
+
+def _has_sep(*texts: str) -> bool:
+    # 区切りを含む名前は os.path.join の解釈（絶対パス化など）に任せる → 一括変換しない
+    return any(c in t for t in texts for c in _SEPS)
+
+def _batch_replace(st: Settings) -> BatchCore | None:
+    t1, r1 = st.target, st.replacement
+    t2, r2 = (st.target_second, st.replacement_second) if st.rename_second_active else ("", "")
+    if not t1 and not t2: return None
+    if _has_sep(r1, r2): return None
+    if st.include_extension:
+        def batch(prefixes, names, exts, counters):
+            full = [n + x for n, x in zip(names, exts)]
+            if t1: full = [f.replace(t1, r1) for f in full]
+            if t2: full = [f.replace(t2, r2) for f in full]
+            return full
+    elif t1 and t2:
+        def batch(prefixes, names, exts, counters):
+            return [n.replace(t1, r1).replace(t2, r2) + x if (t1 in n or t2 in n) else None
+                    for n, x in zip(names, exts)]
+    else:
+        t, r = (t1, r1) if t1 else (t2, r2)
+        def batch(prefixes, names, exts, counters):
+            return [n.replace(t, r) + x if t in n else None for n, x in zip(names, exts)]
+    return batch
+
+def _batch_add_text(st: Settings) -> BatchCore | None:
+    add = st.add_text
+    if not add or _has_sep(add): return None
+    if st.text_position == "先頭に追加":
+        return lambda prefixes, names, exts, counters: [add + n + x for n, x in zip(names, exts)]
+    return lambda prefixes, names, exts, counters: [n + add + x for n, x in zip(names, exts)]
+
+def _batch_sequence(st: Settings) -> BatchCore:
+    digits = max(1, int(st.sequence_digits))
+    mode = st.sequence_mode
+    def batch(prefixes, names, exts, counters):
+        nums = [str(c).zfill(digits) for c in counters]
+        if mode == "フルリネーム": return [s + x for s, x in zip(nums, exts)]
+        if mode == "前に追加": return [f"{s}_{n}{x}" for s, n, x in zip(nums, names, exts)]
+        return [f"{n}_{s}{x}" for s, n, x in zip(nums, names, exts)]
+    return batch
+
+def _batch_folder_name(st: Settings) -> BatchCore:
+    before, include_parent = st.folder_name_position == "前に追加", st.include_parent_folder
+    labels: dict[str, str] = {}
+    def label(prefix: str) -> str:
+        # フォルダ名はディレクトリごとに1回だけ作る（_add_folder_name と同じ規則）
+        lb = labels.get(prefix)
+        if lb is None:
+            d = os.path.dirname(prefix)
+            lb = os.path.basename(d)
+            if include_parent: lb = f"{os.path.basename(os.path.dirname(d))}_{lb}"
+            if len(labels) > _BATCH: labels.clear()
+            labels[prefix] = lb
+        return lb
+    def batch(prefixes, names, exts, counters):
+        labs = list(map(label, prefixes))
+        if before: return [f"{lb}_{n}{x}" for lb, n, x in zip(labs, names, exts)]
+        return [f"{n}_{lb}{x}" for lb, n, x in zip(labs, names, exts)]
+    return batch
+
+def compile_batch(st: Settings) -> BatchCore | None:
+    """
+    Settings → ファイル名の一括変換関数。対応しないモード/設定なら None（1件ずつの compile_transform を使う）。
+    1件ずつ版より約2〜3.5倍速い（bench_processor の transform 段階で計測）。
+    結果は compile_transform と同じ（ファイル対象のみ）。
+    """
+    m = st.method
+    if m.startswith("リネーム"): return _batch_replace(st)
+    if m == "文字列追加": return _batch_add_text(st)
+    if m == "連番": return _batch_sequence(st)
+    if m == "フォルダ名追加": return _batch_folder_name(st)
+    return None
+
+_MISS = object()   # wrap_batch：キャッシュになかった印（None は「変化なし」の結果なので使えない）
+
+class BatchTransform:
+    # 一括変換を tf の位置で渡すための包み（TransformCache.wrap_batch が返す）
+    __slots__ = ("batch",)
+
+    def __init__(self, batch: BatchCore):
+        self.batch = batch
+
+class TransformCache:
+    """
+    変換結果のキャッシュ（ライブプレビュー用）。設定の内容ごとに パス → (counter, 変換後) を持つ。
+    設定を戻した・行が増えただけ、といった再計算では変換済みの行を使い回す。
+    日付モードは更新/作成日時も照合する（監視中に触られたファイルは変換し直す）。
+    ファイルの実体が変わったら（リネーム実行後・再走査時）clear() すること。
+    """
+    MAX_SETTINGS = 4   # 保持する設定の数（古いものから捨てる）
+
+    def __init__(self):
+        self._by_key: dict[tuple, dict[str, tuple]] = {}
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._by_key.clear()
+
+    def _memo(self, key: tuple) -> dict[str, tuple]:
+        with self._lock:
+            memo = self._by_key.pop(key, None)
+            if memo is None: memo = {}
+            self._by_key[key] = memo   # 末尾 = 最近使った
+            while len(self._by_key) > self.MAX_SETTINGS:
+                del self._by_key[next(iter(self._by_key))]
+        return memo
+
+    def wrap(self, key: tuple, tf: Transform, stamped: bool = False) -> Transform:
+        # stamped: 結果が日時に依存する（日付モード）。日時が未取得の項目はキャッシュしない
+        memo = self._memo(key)
+        get = memo.get
+        def cached(path: str, name: str, ext: str, counter: int, entry: FileEntry | None = None) -> str:
+            mark = counter
+            if stamped:
+                if entry is None or (entry.mtime is None and entry.ctime is None):
+                    return tf(path, name, ext, counter, entry)
+                mark = (counter, entry.mtime, entry.ctime)
+            hit = get(path)
+            if hit is not None and hit[0] == mark:
+                return hit[1]
+            new_path = tf(path, name, ext, counter, entry)
+            memo[path] = (mark, new_path)
+            return new_path
+        return cached
+
+    def wrap_batch(self, key: tuple, batch: BatchCore) -> BatchTransform:
+        # 一括変換版：キャッシュにない（番号の変わった）項目だけをまとめて batch にかける
+        memo = self._memo(key)
+        get = memo.get
+        def cached(prefixes, names, exts, counters):
+            keys = [p + n + x for p, n, x in zip(prefixes, names, exts)]
+            out = [hit[1] if (hit := get(k)) is not None and hit[0] == c else _MISS for k, c in zip(keys, counters)]
+            miss = [i for i, v in enumerate(out) if v is _MISS]
+            if miss:
+                news = batch(*([col[i] for i in miss] for col in (prefixes, names, exts, counters)))
+                for i, new in zip(miss, news):
+                    out[i] = new
+                    memo[keys[i]] = (counters[i], new)
+            return out
+        return BatchTransform(cached)
 
 # ---------- プレビュー重複回避 ----------
-def _assign_unique_targets(plan: list[RenameItem]) -> list[RenameItem]:
-    old_set = {it.old_path for it in plan}
-    final_per_dir: dict[str, set[str]] = {}
+class _CollisionIndex:
+    """
+    ディレクトリごとの衝突判定。
+    - ディスク上の名前はディレクトリごとに1回の listdir で取得（probe ごとの exists はしない）
+    - 同じ「base+ext」の [重複NNN] は前回の続きの番号から探す → 衝突が多くても線形
+    freed: これから改名で空く予定のパス（ディスク上にあっても使用可とみなす）
+    """
+    def __init__(self, freed=()):
+        norm = os.path.normcase
+        self._freed = {norm(p) for p in freed}
+        self._disk: dict[str, set[str]] = {}
+        self._taken: dict[str, set[str]] = {}
+        self._next_seq: dict[tuple[str, str], int] = {}
+        self.collisions = 0   # 名前を変えて避けた件数（計測用）
+        self.listdirs = 0
+
+    def _names_on_disk(self, d: str) -> set[str]:
+        names = self._disk.get(d)
+        if names is None:
+            self.listdirs += 1
+            try:
+                names = {os.path.normcase(n) for n in os.listdir(d)}
+            except OSError:
+                names = set()
+            self._disk[d] = names
+        return names
+
+    def _blocked(self, d: str, fname: str, taken: set[str], disk: set[str]) -> bool:
+        key = os.path.normcase(fname)
+        if key in taken: return True
+        return key in disk and os.path.normcase(os.path.join(d, fname)) not in self._freed
+
+    def claim(self, d: str, base: str, ext: str) -> str:
+        taken = self._taken.setdefault(d, set())
+        disk = self._names_on_disk(d)
+        cand = f"{base}{ext}"
+        if self._blocked(d, cand, taken, disk):
+            self.collisions += 1
+            k = (d, os.path.normcase(cand))
+            seq = self._next_seq.get(k, 1)
+            cand = f"{base}[重複{seq:03d}]{ext}"
+            while self._blocked(d, cand, taken, disk):
+                seq += 1
+                cand = f"{base}[重複{seq:03d}]{ext}"
+            self._next_seq[k] = seq + 1
+        taken.add(os.path.normcase(cand))
+        return os.path.join(d, cand)
+
+class PlanCancelled(Exception):
+    """計画生成の中止（cancelled() が True を返した）"""
+
+_CANCEL_EVERY = 1024   # cancelled() を問い合わせる間隔（件数）
+
+def _cancel_point(cancelled: Callable[[], bool] | None, i: int):
+    if cancelled is not None and not (i % _CANCEL_EVERY) and cancelled():
+        raise PlanCancelled()
+
+def _assign_unique_targets(plan: list[RenameItem], dirs: bool = False, cancelled=None, prof=None) -> list[RenameItem]:
+    # dirs: フォルダ対象の計画か（従来の isfile 判定を呼び出し側の情報で置き換え）
+    t = time.perf_counter() if prof is not None else 0.0
+    index = _CollisionIndex(freed=(it.old_path for it in plan))
     out: list[RenameItem] = []
-    for it in plan:
-        d = os.path.dirname(it.new_path) if os.path.isfile(it.old_path) else os.path.dirname(it.old_path)
-        if d not in final_per_dir:
-            final_per_dir[d] = set()
+    for i, it in enumerate(plan):
+        _cancel_point(cancelled, i)
+        d = os.path.dirname(it.old_path) if dirs else os.path.dirname(it.new_path)
         base, ext = os.path.splitext(os.path.basename(it.new_path))
-        cand = os.path.join(d, f"{base}{ext}")
-        seq = 1
-        def used(p: str) -> bool: return (p in final_per_dir[d])
-        while used(cand) or (os.path.exists(cand) and cand not in old_set):
-            cand = os.path.join(d, f"{base}[重複{seq:03d}]{ext}")
-            seq += 1
-        final_per_dir[d].add(cand)
-        out.append(RenameItem(old_path=it.old_path, new_path=cand))
+        out.append(RenameItem(old_path=it.old_path, new_path=index.claim(d, base, ext)))
+    if prof is not None:
+        prof.add_time("collisions", time.perf_counter() - t)
+        prof.count("collisions", index.collisions); prof.count("sys.listdir", index.listdirs)
     return out
 
+def _iter_unique_per_dir(raw: Iterable[RenameItem], dirs: bool = False, cancelled=None, prof=None) -> Iterator[RenameItem]:
+    """
+    ストリーム版の _assign_unique_targets。元のディレクトリが同じ項目の連続（ひと区切り）ごとに衝突を解決して流す。
+    区切りをまたいで状態を持たないので、溜めるのは最大のディレクトリ1つ分だけ。
+    （別のディレクトリへ移る名前・まとまっていない入力の重複は、実行時の apply_rename が最終名を決め直す）
+    """
+    run: list[RenameItem] = []
+    cur = None
+    for it in raw:
+        d = os.path.dirname(it.old_path)
+        if d != cur and run:
+            yield from _assign_unique_targets(run, dirs, cancelled, prof)
+            run = []
+        cur = d
+        run.append(it)
+    if run:
+        yield from _assign_unique_targets(run, dirs, cancelled, prof)
+
+def _dir_runs(entries: Iterable[FileEntry]) -> Iterator[list[FileEntry]]:
+    # 同じディレクトリの連続ごとに区切る
+    run: list[FileEntry] = []
+    cur = None
+    for e in entries:
+        d = os.path.dirname(e.path)
+        if d != cur and run:
+            yield run
+            run = []
+        cur = d
+        run.append(e)
+    if run:
+        yield run
+
+def _sorted_per_dir(entries: Iterable[FileEntry]) -> Iterator[FileEntry]:
+    # ディレクトリごとに名前順（path_sort_key）へ。まとまった入力なら全体ソートと同じ結果
+    for run in _dir_runs(entries):
+        run.sort(key=lambda e: path_sort_key(e.path))
+        yield from run
+
+def _grouped_by_dir(paths: list["str | FileEntry"]) -> bool:
+    # 同じディレクトリの項目が連続しているか（一度離れたディレクトリが再び出てこない）
+    done: set[str] = set()
+    cur = None
+    for p in paths:
+        d = os.path.dirname(_path_of(p))
+        if d != cur:
+            if d in done: return False
+            done.add(cur); cur = d
+    return True
+
 # ---------- 計画生成 ----------
-def generate_rename_plan(paths: list[str], st: Settings) -> list[RenameItem]:
-    files = _collect_paths(paths, st.include_subfolders)
-    per_dir_counter = {}
-    raw: list[RenameItem] = []
+# 変換だけを行う生成器（衝突解決の前）。一覧版/ストリーム版で共用する
+def _iter_raw_files(entries: Iterable[FileEntry], st: Settings, tf: "Transform | BatchTransform | None", numbering: str | None,
+                    cancelled=None, pre=None) -> Iterator[RenameItem]:
+    # numbering: "order" = 並び順に連番 / "per_dir" = フォルダごとに連番 / None = 番号を使わない
+    # tf: None なら、一括変換できるモードはブロック単位で、それ以外は compile_transform で変換する
+    #     BatchTransform（キャッシュ付きの一括変換）ならブロック単位で
+    batch = tf.batch if isinstance(tf, BatchTransform) else compile_batch(st) if tf is None else None
+    if batch is not None:
+        yield from _iter_raw_files_batched(entries, st, batch, numbering, cancelled, pre)
+        return
+    if tf is None: tf = compile_transform(st)
     start = max(1, int(st.sequence_start))
-    for f in files:
-        d = os.path.dirname(f)
-        cur = per_dir_counter.get(d, start - 1) + 1
-        per_dir_counter[d] = cur
+    per_dir_counter = {}
+    cur = start
+    for i, e in enumerate(entries):
+        _cancel_point(cancelled, i)
+        f = e.path
+        if numbering == "order":
+            cur = start + i
+        elif numbering == "per_dir":
+            d = os.path.dirname(f)
+            cur = per_dir_counter.get(d, start - 1) + 1
+            per_dir_counter[d] = cur
+        if pre is not None and not pre(f):
+            continue
         name, ext = os.path.splitext(os.path.basename(f))
-        new_path = _transform_name(f, name, ext, st, cur)
+        new_path = tf(f, name, ext, cur, e)
         if new_path:
-            raw.append(RenameItem(old_path=f, new_path=new_path))
-    return _assign_unique_targets(raw)
+            yield RenameItem(old_path=f, new_path=new_path)
 
-def generate_rename_plan_in_order(ordered_paths: list[str], st: Settings) -> list[RenameItem]:
-    raw: list[RenameItem] = []
-    start = max(1, int(st.sequence_start))
-    for i, f in enumerate(ordered_paths, start=start):
-        name, ext = os.path.splitext(os.path.basename(f))
-        new_path = _transform_name(f, name, ext, st, i)
-        if new_path:
-            raw.append(RenameItem(old_path=f, new_path=new_path))
-    return _assign_unique_targets(raw)
+def _split_block(paths: list[str]) -> tuple[list[str], list[str], list[str], list[str]]:
+    # パスの列 → (prefix, 名前(拡張子込み), 名前, 拡張子) の列。_split_prefix / os.path.splitext と同じ結果
+    if len(_SEPS) == 1:
+        sep = _SEPS
+        cut = [p.rfind(sep) + 1 for p in paths]
+    else:
+        cut = [max(p.rfind("\\"), p.rfind("/")) + 1 for p in paths]
+        cut = [c or (2 if p[1:2] == ":" else 0) for p, c in zip(paths, cut)]   # "C:name"
+    prefixes = [p[:c] for p, c in zip(paths, cut)]
+    bases = [p[c:] for p, c in zip(paths, cut)]
+    dots = [b.rfind(".") for b in bases]
+    # 拡張子あり = 最後のドットより前に「ドット以外」の文字がある（".bashrc" などは拡張子なし）
+    dots = [i if i > 0 and (b[0] != "." or b[:i].strip(".")) else -1 for b, i in zip(bases, dots)]
+    names = [b[:i] if i > 0 else b for b, i in zip(bases, dots)]
+    exts = [b[i:] if i > 0 else "" for b, i in zip(bases, dots)]
+    return prefixes, bases, names, exts
 
-def generate_rename_plan_in_order_per_dir(ordered_paths: list[str], st: Settings) -> list[RenameItem]:
-    per_dir_counter = {}
-    raw: list[RenameItem] = []
+def _iter_raw_files_batched(entries: Iterable[FileEntry], st: Settings, batch: BatchCore, numbering: str | None,
+                            cancelled=None, pre=None) -> Iterator[RenameItem]:
+    # _iter_raw_files の一括版（結果は同じ）。_BATCH 件ずつ列に分けて batch にかける
     start = max(1, int(st.sequence_start))
-    for f in ordered_paths:
-        d = os.path.dirname(f)
-        cur = per_dir_counter.get(d, start - 1) + 1
-        per_dir_counter[d] = cur
-        name, ext = os.path.splitext(os.path.basename(f))
-        new_path = _transform_name(f, name, ext, st, cur)
-        if new_path:
-            raw.append(RenameItem(old_path=f, new_path=new_path))
-    return _assign_unique_targets(raw)
+    per_dir_counter = {}
+    dirname, join = os.path.dirname, os.path.join
+    it = iter(entries)
+    done = 0
+    while True:
+        block = list(islice(it, _BATCH))
+        if not block: break
+        if cancelled is not None and cancelled(): raise PlanCancelled()
+        n = len(block)
+        paths = [e.path for e in block]
+        prefixes, bases, names, exts = _split_block(paths)
+        # 新しいパス = os.path.join(dirname(path), 新しい名前)。join の前半はディレクトリごとに1回
+        heads = {pfx: dirname(pfx) for pfx in set(prefixes)}
+        if numbering == "order":
+            counters = list(range(start + done, start + done + n))
+        elif numbering == "per_dir":
+            counters = []
+            for pfx in prefixes:
+                d = heads[pfx]
+                c = per_dir_counter[d] = per_dir_counter.get(d, start - 1) + 1
+                counters.append(c)
+        else:
+            counters = [start] * n
+        done += n
+        if pre is not None:
+            keep = [k for k, p in enumerate(paths) if pre(p)]
+            if len(keep) < n:
+                paths, prefixes, bases, names, exts, counters = (
+                    [col[k] for k in keep] for col in (paths, prefixes, bases, names, exts, counters))
+            if not paths: continue
+        lead = {pfx: join(d, "") for pfx, d in heads.items()}
+        news = batch(prefixes, names, exts, counters)
+        yield from [RenameItem(p, lead[pfx] + new) for p, pfx, base, new in zip(paths, prefixes, bases, news)
+                    if new is not None and new != base and (new or lead[pfx])]
 
-def generate_rename_plan_for_dirs(paths: list[str], st: Settings, visual_order: bool = True) -> list[RenameItem]:
+def _iter_raw_dirs(paths: Iterable["str | FileEntry"], st: Settings, tf: Transform, visual_order: bool,
+                   cancelled=None) -> Iterator[RenameItem]:
     seen = set()
-    targets = []
+    pre = compile_prefilter(st)
+    idx = max(1, int(st.sequence_start)) if visual_order else 1
     for p in paths:
-        d = os.path.abspath(p)
-        if d not in seen:
-            seen.add(d); targets.append(d)
-    raw: list[RenameItem] = []
-    start = max(1, int(st.sequence_start))
-    for idx, d in enumerate(targets, start=start if visual_order else 1):
-        counter = idx if st.method == "連番" else 1
-        new_path = _transform_dirname(d, st, counter)
+        d = os.path.abspath(_path_of(p))
+        if d in seen: continue
+        seen.add(d)
+        e = p if isinstance(p, FileEntry) and p.path == d else FileEntry(d, True)
+        _cancel_point(cancelled, idx)
+        counter = idx
+        idx += 1
+        if pre is not None and not pre(d):
+            continue
+        if st.method != "連番": counter = 1
+        new_path = tf(d, os.path.basename(d), "", counter, e)
         if not new_path:
             continue
         if os.path.dirname(new_path) == os.path.dirname(d):
-            raw.append(RenameItem(old_path=d, new_path=new_path))
+            yield RenameItem(old_path=d, new_path=new_path)
         else:
             parent = os.path.dirname(d)
             base = os.path.basename(new_path)
-            raw.append(RenameItem(old_path=d, new_path=os.path.join(parent, base)))
-    return _assign_unique_targets(raw)
+            yield RenameItem(old_path=d, new_path=os.path.join(parent, base))
+
+def generate_rename_plan(paths: list["str | FileEntry"], st: Settings, cancelled=None, tf=None, prof=None) -> list[RenameItem]:
+    files = _collect_entries(paths, st.include_subfolders)
+    numbering = "per_dir" if st.method == "連番" else None   # フォルダごとの番号は連番のときだけ使う
+    raw = list(_iter_raw_files(files, st, tf, numbering, cancelled, compile_prefilter(st)))
+    return _assign_unique_targets(raw, cancelled=cancelled, prof=prof)
+
+def generate_rename_plan_in_order(ordered_paths: list["str | FileEntry"], st: Settings, cancelled=None, tf=None, prof=None) -> list[RenameItem]:
+    raw = list(_iter_raw_files(map(_as_entry, ordered_paths), st, tf, "order", cancelled))
+    return _assign_unique_targets(raw, cancelled=cancelled, prof=prof)
+
+def generate_rename_plan_in_order_per_dir(ordered_paths: list["str | FileEntry"], st: Settings, cancelled=None, tf=None, prof=None) -> list[RenameItem]:
+    raw = list(_iter_raw_files(map(_as_entry, ordered_paths), st, tf, "per_dir", cancelled))
+    return _assign_unique_targets(raw, cancelled=cancelled, prof=prof)
+
+def generate_rename_plan_for_dirs(paths: list["str | FileEntry"], st: Settings, visual_order: bool = True,
+                                  cancelled=None, tf=None, prof=None) -> list[RenameItem]:
+    raw = list(_iter_raw_dirs(paths, st, tf or compile_transform(st), visual_order, cancelled))
+    return _assign_unique_targets(raw, dirs=True, cancelled=cancelled, prof=prof)
+
+# ストリーム版：計画を溜めずに1件ずつ返す。衝突はディレクトリ単位で解決するので、
+# 入力は同じディレクトリの項目がまとまった順（走査順 / path_sort_key 順）であること
+def iter_rename_plan_in_order(ordered_paths: Iterable["str | FileEntry"], st: Settings, cancelled=None, tf=None, prof=None) -> Iterator[RenameItem]:
+    raw = _iter_raw_files(map(_as_entry, ordered_paths), st, tf, "order", cancelled)
+    return _iter_unique_per_dir(raw, cancelled=cancelled, prof=prof)
+
+def iter_rename_plan_in_order_per_dir(ordered_paths: Iterable["str | FileEntry"], st: Settings, cancelled=None, tf=None, prof=None) -> Iterator[RenameItem]:
+    raw = _iter_raw_files(map(_as_entry, ordered_paths), st, tf, "per_dir", cancelled)
+    return _iter_unique_per_dir(raw, cancelled=cancelled, prof=prof)
+
+def iter_rename_plan_for_dirs(paths: Iterable["str | FileEntry"], st: Settings, visual_order: bool = True,
+                              cancelled=None, tf=None, prof=None) -> Iterator[RenameItem]:
+    raw = _iter_raw_dirs(paths, st, tf or compile_transform(st), visual_order, cancelled)
+    return _iter_unique_per_dir(raw, dirs=True, cancelled=cancelled, prof=prof)
+
+def collect_dirs(paths: list[str]) -> list[str]:
+    # フォルダ対象：ドロップされたフォルダ自身 / ファイルならその親フォルダ
+    s = set()
+    for p in paths:
+        ap = os.path.abspath(p)
+        if os.path.isdir(ap): s.add(ap)
+        elif os.path.isfile(ap): s.add(os.path.dirname(ap))
+    return sorted(s, key=path_sort_key)
+
+def _plan_transform(st: Settings, scope: str, cache: TransformCache | None) -> "Transform | BatchTransform | None":
+    # 一括変換できるモードは各生成関数がブロック単位で変換する（キャッシュ付きなら未変換の項目だけ）
+    key = (scope,) + astuple(st)
+    batch = compile_batch(st) if scope == "file" else None
+    if batch is not None:
+        return cache.wrap_batch(key, batch) if cache is not None else None
+    tf = compile_transform(st)
+    if cache is not None:
+        tf = cache.wrap(key, tf, stamped=st.method == "日付")
+    return tf
+
+def generate_plan(targets: list["str | FileEntry"], st: Settings, scope: str = "file",
+                  cancelled: Callable[[], bool] | None = None,
+                  cache: TransformCache | None = None, prof=None) -> list[RenameItem]:
+    """
+    GUI/CLI 共通の入口。targets は並び順どおりに連番を振る対象
+    （scope="file" ならファイル、"folder" ならフォルダ）。
+    cancelled: 定期的に呼ばれ、True を返すと PlanCancelled で打ち切る（バックグラウンド用）
+    cache: 変換結果を設定ごとに使い回す（ライブプレビュー用）
+    prof: profiling.Profile（省略可）。衝突解決の時間と件数を数える（全体の時間は呼び出し側で "plan" として測る）
+    """
+    tf = _plan_transform(st, scope, cache)
+    if scope == "folder":
+        return generate_rename_plan_for_dirs(targets, st, visual_order=True, cancelled=cancelled, tf=tf, prof=prof)
+    if st.method == "連番":
+        if st.sequence_per_folder:
+            return generate_rename_plan_in_order_per_dir(targets, st, cancelled, tf, prof)
+        return generate_rename_plan_in_order(targets, st, cancelled, tf, prof)
+    return generate_rename_plan(targets, st, cancelled, tf, prof)
+
+def iter_plan(targets: Iterable["str | FileEntry"], st: Settings, scope: str = "file",
+              cancelled: Callable[[], bool] | None = None,
+              cache: TransformCache | None = None, prof=None) -> Iterator[RenameItem]:
+    """
+    generate_plan のストリーム版（計画の一覧を作らない）。返す順はディレクトリ単位。
+    targets は同じディレクトリの項目がまとまった順であること（走査順 / path_sort_key 順）。
+    リストでまとまっていないとき（表を列で並べ替えた順など）は generate_plan と同じ全体処理になる。
+    連番以外はディレクトリごとに名前順へ並べて処理する（generate_plan の全体ソートと同じ結果）。
+    """
+    if isinstance(targets, list) and not _grouped_by_dir(targets):
+        yield from generate_plan(targets, st, scope, cancelled, cache, prof)
+        return
+    tf = _plan_transform(st, scope, cache)
+    if scope == "folder":
+        yield from iter_rename_plan_for_dirs(targets, st, True, cancelled, tf, prof)
+    elif st.method == "連番":
+        gen = iter_rename_plan_in_order_per_dir if st.sequence_per_folder else iter_rename_plan_in_order
+        yield from gen(targets, st, cancelled, tf, prof)
+    else:
+        raw = _iter_raw_files(_sorted_per_dir(map(_as_entry, targets)), st, tf, None, cancelled, compile_prefilter(st))
+        yield from _iter_unique_per_dir(raw, cancelled=cancelled, prof=prof)
 
 # ---------- 実行 ----------
 def _temp_name_for(path: str) -> str:
@@ -346,39 +1003,279 @@ def _temp_name_for(path: str) -> str:
     name, ext = os.path.splitext(os.path.basename(path))
     return os.path.join(d, f".__tmp__{name}__{uuid.uuid4().hex}{ext}")
 
-def apply_rename(items: list[RenameItem]) -> list[dict]:
-    results = []
-    if not items: return results
-    temps = {}
+# ---------- 事前確認 ----------
+_NAME_MAX = 255   # pathconf で取れないときの名前の上限（Windows は文字数、ほかはバイト数）
+_WIN_BAD_CHARS = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+_WIN_RESERVED = {"CON", "PRN", "AUX", "NUL", *(f"COM{i}" for i in range(1, 10)), *(f"LPT{i}" for i in range(1, 10))}
+
+def _dir_state(d: str) -> tuple[int | None, int, tuple[int, str] | None]:
+    # (st_dev, 名前の上限, 問題)。1ディレクトリにつき stat / access / pathconf を1回ずつ
     try:
-        for it in items:
-            t = _temp_name_for(it.old_path)
-            os.rename(it.old_path, t)
-            temps[it.old_path] = t
-    except Exception as e:
-        for src, tmp in temps.items():
-            if os.path.exists(tmp):
-                try: os.rename(tmp, src)
-                except Exception: pass
-        for it in items:
-            ok = it.old_path in temps
-            results.append({"old_path": it.old_path, "new_path": it.new_path, "ok": ok, "error": None if ok else str(e)})
+        dev = os.stat(d or ".").st_dev
+    except OSError as e:
+        return None, _NAME_MAX, (e.errno or errno.ENOENT, f"フォルダを開けません: {e.strerror or e}")
+    # Windows の access はフォルダの読み取り専用属性しか見ない（改名は妨げない）ので確かめない
+    if os.name != "nt" and not os.access(d or ".", os.W_OK | os.X_OK):
+        return dev, _NAME_MAX, (errno.EACCES, "フォルダに書き込めません")
+    limit = _NAME_MAX
+    if hasattr(os, "pathconf"):
+        try:
+            limit = os.pathconf(d or ".", "PC_NAME_MAX")
+        except (OSError, ValueError):
+            pass
+    return dev, limit, None
+
+def _name_problem(name: str, limit: int) -> tuple[int, str] | None:
+    if name in ("", ".", ".."):
+        return errno.EINVAL, "使えない名前です"
+    if os.name == "nt":
+        if _WIN_BAD_CHARS.search(name) or name[-1] in " .":
+            return errno.EINVAL, "名前に使えない文字があります"
+        if name.split(".", 1)[0].rstrip(" ").upper() in _WIN_RESERVED:
+            return errno.EINVAL, "Windows の予約名です"
+        size = len(name)
+    else:
+        if "\0" in name:
+            return errno.EINVAL, "名前に使えない文字があります"
+        try:
+            size = len(os.fsencode(name))
+        except UnicodeEncodeError:
+            return errno.EILSEQ, "名前に使えない文字があります"
+    if size > limit:
+        return errno.ENAMETOOLONG, f"名前が長すぎます（上限 {limit}）"
+    return None
+
+def preflight(plan: RenamePlan, prof=None) -> dict[int, tuple[int, str]]:
+    """
+    最初の rename の前に、実行できない項目をまとめて見つける。戻り値は {行: (errno, 理由)}。
+    - 元/先のフォルダ：存在と書き込み権限（ディレクトリごとに1回。項目ごとの syscall はしない）
+    - 別のドライブへの移動（rename では動かせない）
+    - 新しい名前：長さ・使えない文字・Windows の予約名
+    - 実行できない項目の元の名前を行き先にしている項目（空かないので連鎖も止める）
+    ファイルのロックは開いてみないと分からないので、ここでは見ない（実行時の失敗として扱う）。
+    """
+    with stage(prof, "preflight"):
+        dirs: dict[int, tuple[int | None, int, tuple[int, str] | None]] = {}
+        for k in {*plan._old_dir, *plan._new_dir}:
+            dirs[k] = _dir_state(plan._dirname[k])
+        if prof is not None: prof.count("sys.stat", len(dirs))
+
+        blocked: dict[int, tuple[int, str]] = {}
+        old_dir, new_dir, old_name, new_name = plan._old_dir, plan._new_dir, plan._old_name, plan._new_name
+        for i in range(len(plan)):
+            a, b = old_dir[i], new_dir[i]
+            if a == b and old_name[i] == new_name[i]: continue   # 動かさない
+            dev_a, _, bad = dirs[a]
+            dev_b, limit, bad_b = dirs[b]
+            bad = bad or bad_b
+            if bad is None and dev_a != dev_b:
+                bad = (errno.EXDEV, "別のドライブへは移動できません")
+            if bad is None:
+                bad = _name_problem(new_name[i], limit)
+            if bad is not None: blocked[i] = bad
+
+        if blocked:
+            # 動かない項目の元の名前を待つ項目も止める（連鎖・循環の途中で一時名から戻す手間を省く）
+            norm = os.path.normcase
+            by_target: dict[str, int] = {}
+            for i in range(len(plan)):
+                by_target.setdefault(norm(plan.new_path(i)), i)
+            todo = list(blocked)
+            while todo:
+                j = by_target.get(norm(plan.old_path(todo.pop())))
+                if j is not None and j not in blocked:
+                    blocked[j] = (errno.EBUSY, "行き先を空ける項目が実行できないため中止")
+                    todo.append(j)
+        if prof is not None: prof.count("blocked", len(blocked))
+    return blocked
+
+def _rename_groups(plan: RenamePlan, rows: Iterable[int] | None = None) -> list[list[int]]:
+    """
+    互いに干渉しない単位（ディレクトリのまとまり）に分ける。
+    - 元/先のディレクトリが同じ項目は同じグループ（衝突・連鎖の判定が閉じる）
+    - フォルダ自体を改名する項目は、その配下を触るグループとも同じグループにする
+    """
+    norm = os.path.normcase
+    parent: dict[str, str] = {}
+    def find(x: str) -> str:
+        while parent.setdefault(x, x) != x:
+            parent[x] = parent[parent[x]]; x = parent[x]
+        return x
+    def union(a: str, b: str):
+        ra, rb = find(a), find(b)
+        if ra != rb: parent[ra] = rb
+
+    rows = range(len(plan)) if rows is None else rows
+    keys = []
+    for i in rows:
+        a = norm(plan.old_dir(i)); b = norm(plan.new_dir(i))
+        union(a, b); keys.append((i, a))
+    sources = {norm(plan.old_path(i)) for i, _ in keys}
+    for d in list(parent):
+        up = d
+        while True:
+            nxt = os.path.dirname(up)
+            if nxt == up: break
+            if up in sources: union(d, nxt)
+            up = nxt
+
+    groups: dict[str, list[int]] = {}
+    for i, k in keys:
+        groups.setdefault(find(k), []).append(i)
+    return list(groups.values())
+
+def apply_plan(plan: RenamePlan, workers: int = 1, journal=None,
+               progress: Callable[[int], None] | None = None, prof=None,
+               blocked: dict[int, tuple[int, str]] | None = None) -> RenameResults:
+    """
+    workers > 1 のとき、互いに独立したディレクトリ群を並列にリネームする
+    （ネットワークドライブなど rename 1回の往復が重い環境向け）。
+    ディレクトリ内の順序・衝突処理は直列版と同じ。結果は plan と同じ順。
+    journal: RenameJournal（省略可）。中断時の復旧と取り消し用に各 rename を記録する
+    progress: 1件終わるごとに progress(1)（並列時は各ワーカーのスレッドから呼ばれる）
+    prof: profiling.Profile（省略可）。"rename" の時間と rename 回数・一時名・失敗などを数える
+    blocked: preflight() の結果（省略時はここで確かめる）。該当する項目はリネームせず失敗として返す
+    """
+    if blocked is None: blocked = preflight(plan, prof)
+    own = journal is not None and not journal.active
+    if own: journal.begin(len(plan))
+    try:
+        with stage(prof, "rename"):
+            results = _apply_plan(plan, workers, journal, progress, prof, blocked)
+    except BaseException:
+        # end を書かずに閉じる → 次回起動時の recover() が一時名を後始末する
+        if own: journal.close()
+        raise
+    if own: journal.end(results)
+    if prof is not None:
+        prof.count("files", len(plan)); prof.count("failures", results.failed_count)
+    return results
+
+def apply_rename(items: "list[RenameItem] | RenamePlan", workers: int = 1, journal=None,
+                 progress: Callable[[int], None] | None = None) -> list[dict]:
+    # 従来の入口（結果は dict のリスト）。中身は apply_plan
+    plan = items if isinstance(items, RenamePlan) else RenamePlan(items)
+    return apply_plan(plan, workers, journal, progress).to_dicts()
+
+def _apply_plan(plan: RenamePlan, workers: int, journal, progress, prof=None, blocked=None) -> RenameResults:
+    results = RenameResults(plan)
+    rows = range(len(plan))
+    if blocked:
+        for i, (code, reason) in blocked.items():
+            results.record(i, False, plan.new_path(i), f"事前確認: {reason}", code)
+        results.blocked = len(blocked)
+        if progress is not None: progress(len(blocked))
+        rows = [i for i in rows if i not in blocked]
+    n = len(rows)
+    groups = _rename_groups(plan, rows) if workers > 1 and n >= 2 else []
+    if len(groups) < 2:
+        _apply_rename_serial(plan, rows, results, journal, progress, prof)
         return results
+    # 各グループは別々の行にだけ書く
+    with ThreadPoolExecutor(max_workers=min(workers, len(groups))) as pool:
+        for f in [pool.submit(_apply_rename_serial, plan, g, results, journal, progress, prof) for g in groups]:
+            f.result()
+    return results
 
-    old_set = set(it.old_path for it in items)
-    placed = {}
-    for it in items:
-        d = os.path.dirname(it.new_path)
-        base, ext = os.path.splitext(os.path.basename(it.new_path))
-        cand = os.path.join(d, f"{base}{ext}")
-        seq = 1
-        while (os.path.exists(cand) and cand not in old_set) or (cand in placed.values()):
-            cand = os.path.join(d, f"{base}[重複{seq:03d}]{ext}")
-            seq += 1
+def _apply_rename_serial(plan: RenamePlan, rows, results: RenameResults, journal=None, progress=None, prof=None):
+    """
+    plan の rows の項目を、依存関係を見て行き先が空いているものから直接リネームする（1件1回の rename）。
+    - A の行き先が B の元の名前なら、B が退いてから A を動かす（連鎖）
+    - 一時名を経由するのは循環（A↔B など）1つにつき1件だけ
+    - 失敗した項目の元の名前を待っていた項目は実行せず失敗扱い（上書きはしない）
+    結果は results の同じ行へ書く。
+    """
+    n = len(rows)
+    if not n: return
+    norm = os.path.normcase
+    old = [plan.old_path(r) for r in rows]
+
+    # 1) 最終名の確定（計画内の元の名前はすべて空く前提）
+    index = _CollisionIndex(freed=old)
+    final: list[str] = []
+    for r in rows:
+        base, ext = os.path.splitext(plan.new_name(r))
+        final.append(index.claim(plan.new_dir(r), base, ext))
+    if prof is not None:
+        prof.count("collisions", index.collisions); prof.count("sys.listdir", index.listdirs)
+
+    # 2) 依存グラフ：行き先 = 別項目の元の名前 なら、その項目が退くまで待つ
+    #    行き先は一意なので、各項目を待つのは高々1件（鎖か循環にしかならない）
+    src_row = {norm(p): i for i, p in enumerate(old)}
+    waiter: dict[int, int] = {}
+    ready: deque[int] = deque()
+    for i in range(n):
+        j = src_row.get(norm(final[i]))
+        if j is None or j == i:
+            ready.append(i)
+        else:
+            waiter[j] = i
+    del src_row
+
+    cur = old[:]   # 実体の現在地（循環解消中は一時名）
+    done = bytearray(n)
+
+    def finish(i: int, ok: bool, path: str, err: str | None = None, errno: int | None = None):
+        done[i] = 1
+        results.record(rows[i], ok, path, err, errno)
+        if progress is not None: progress(1)
+
+    def restore(i: int) -> str:
+        # 一時名のまま取り残さない：元の名前が空いていれば戻し、埋まっていれば近い空き名へ
+        src = old[i]
+        if cur[i] == src: return src
+        dest = src
+        if prof is not None: prof.count("sys.lexists")
+        if os.path.lexists(src):
+            base, ext = os.path.splitext(os.path.basename(src))
+            dest = index.claim(os.path.dirname(src), base, ext)
+        if prof is not None: prof.count("sys.rename")
+        try:
+            os.rename(cur[i], dest)
+        except Exception:
+            return cur[i]
+        if journal is not None: journal.moved(src, cur[i], dest)
+        cur[i] = dest
+        return dest
+
+    def fail(i: int, e: Exception):
+        first, err = i, str(e)
+        while i is not None and not done[i]:
+            path = restore(i) if cur[i] != old[i] else final[i]
+            if i == first: finish(i, False, path, err, getattr(e, "errno", None))
+            else:          finish(i, False, path, f"先行するリネームに失敗: {err}")
+            i = waiter.pop(i, None)
+
+    def run_ready():
+        while ready:
+            i = ready.popleft()
+            if done[i]: continue
+            try:
+                if cur[i] != final[i]:
+                    if prof is not None: prof.count("sys.rename")
+                    os.rename(cur[i], final[i])
+            except Exception as e:
+                fail(i, e); continue
+            if journal is not None: journal.moved(old[i], cur[i], final[i])
+            cur[i] = final[i]
+            finish(i, True, final[i])
+            k = waiter.pop(i, None)
+            if k is not None: ready.append(k)
+
+    run_ready()
+
+    # 3) 残りは循環のみ：1件を一時名へ退避して循環を鎖にほどく
+    for i in range(n):
+        if done[i] or cur[i] != old[i]:
+            continue
+        tmp = _temp_name_for(cur[i])
+        if journal is not None: journal.park(old[i], cur[i], tmp, final[i])
+        if prof is not None: prof.count("temp_renames"); prof.count("sys.rename")
         try:
-            os.rename(temps[it.old_path], cand)
-            placed[it.old_path] = cand
-            results.append({"old_path": it.old_path, "new_path": cand, "ok": True, "error": None})
+            os.rename(cur[i], tmp)
         except Exception as e:
-            results.append({"old_path": it.old_path, "new_path": cand, "ok": False, "error": str(e)})
-    return results
+            fail(i, e); continue
+        cur[i] = tmp
+        k = waiter.pop(i, None)
+        if k is not None: ready.append(k)
+        run_ready()
@@ -0,0 +1,121 @@
+"""
+処理の計測（任意）。1回の操作（走査 / プレビュー / 実行）ごとに段階別の時間と件数を集める。
+- Profile を processor / workers の各関数へ prof= で渡す（None なら計測しない。呼び出し側の分岐だけで済む）
+- summary() はトースト用の1行、write_log() は ReNameTool_profile.jsonl へ1行1件の JSON
+- Capture は1回分の詳細プロファイル（pyinstrument があれば HTML、無ければ cProfile の .prof）
+"""
+import cProfile, json, threading, time
+from collections import Counter
+from contextlib import nullcontext
+from datetime import datetime
+
+LOG_FILE = "ReNameTool_profile.jsonl"
+
+# 段階（表示順）。plan は変換＋衝突解決の合計として測り、finish() で transform（変換のみ）に直す
+STAGES = {"scan": "走査", "transform": "変換", "collisions": "衝突解決", "table": "表", "preflight": "事前確認", "rename": "リネーム"}
+COUNTS = {"files": "件", "dirs": "フォルダ", "collisions": "衝突", "temp_renames": "一時名", "blocked": "実行不可", "failures": "失敗"}
+# OS 呼び出しの件数は "sys." で始まるキー（sys.scandir / sys.stat / sys.listdir / sys.rename / sys.lexists）
+
+class Profile:
+    def __init__(self, op: str):
+        self.op = op
+        self.stages: dict[str, float] = {}
+        self.counts: Counter = Counter()
+        self.total: float | None = None
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()   # ワーカーのスレッド / 並列リネームからも書く
+
+    def stage(self, name: str) -> "_Stage":
+        return _Stage(self, name)
+
+    def add_time(self, name: str, sec: float):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + sec
+
+    def count(self, key: str, n: int = 1):
+        if not n: return
+        with self._lock:
+            self.counts[key] += n
+
+    def finish(self) -> "Profile":
+        self.total = time.perf_counter() - self._t0
+        plan = self.stages.pop("plan", None)
+        if plan is not None:
+            self.stages["transform"] = max(0.0, plan - self.stages.get("collisions", 0.0))
+        return self
+
+    def syscalls(self) -> int:
+        return sum(v for k, v in self.counts.items() if k.startswith("sys."))
+
+    def _ordered_stages(self) -> list[tuple[str, float]]:
+        rank = {k: i for i, k in enumerate(STAGES)}
+        return sorted(self.stages.items(), key=lambda kv: rank.get(kv[0], len(rank)))
+
+    def summary(self) -> str:
+        parts = [f"{STAGES.get(k, k)} {v:.2f}s" for k, v in self._ordered_stages()]
+        nums = [f"{COUNTS[k]} {self.counts[k]}" for k in COUNTS if self.counts.get(k)]
+        n = self.syscalls()
+        if n: nums.append(f"syscall {n}")
+        text = " / ".join(parts)
+        return f"{text}（{', '.join(nums)}）" if nums else text
+
+    def to_dict(self) -> dict:
+        return dict(time=datetime.now().isoformat(timespec="seconds"), op=self.op,
+                    total=round(self.total, 6) if self.total is not None else None,
+                    stages={k: round(v, 6) for k, v in self._ordered_stages()},
+                    counts=dict(self.counts), syscalls=self.syscalls())
+
+    def write_log(self, path: str = LOG_FILE):
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.to_dict(), ensure_ascii=False) + "\n")
+
+class _Stage:
+    __slots__ = ("_prof", "_name", "_t")
+
+    def __init__(self, prof: Profile, name: str):
+        self._prof, self._name = prof, name
+
+    def __enter__(self):
+        self._t = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._prof.add_time(self._name, time.perf_counter() - self._t)
+        return False
+
+def stage(prof: Profile | None, name: str):
+    # prof が None なら何もしない with
+    return nullcontext() if prof is None else prof.stage(name)
+
+class Capture:
+    """
+    with の中（呼び出したスレッドのみ）の詳細プロファイルを取り、終わったら path に保存する。
+    pyinstrument が入っていれば HTML、無ければ標準の cProfile（.prof。snakeviz / pstats で開く）。
+    """
+    def __init__(self, label: str):
+        stamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        self._base = f"ReNameTool_profile_{label}_{stamp}"
+        self.path: str | None = None
+        self._p = None
+
+    def __enter__(self):
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            self._p = cProfile.Profile(); self._p.enable()
+        else:
+            self._p = Profiler(); self._p.start()
+        return self
+
+    def __exit__(self, *exc):
+        p = self._p
+        if isinstance(p, cProfile.Profile):
+            p.disable()
+            self.path = self._base + ".prof"
+            p.dump_stats(self.path)
+        else:
+            p.stop()
+            self.path = self._base + ".html"
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.write(p.output_html())
+        return False
@@ -0,0 +1,215 @@
+"""
+ReNameTool ヘッドレス版（Qt を読み込まない。cron / サーバー向け）
+
+  python -m renamer_cli [オプション] PATH...
+
+- 既定は計画（old_path → new_path）を JSONL / CSV で出力するだけ（ドライラン）
+  計画はフォルダ単位で作りながら書き出すので、大きなツリーでもメモリは一定（連番は全体を並べてから）
+- --execute で実際にリネームし、結果（ok / error 付き）を出力。進捗は標準エラーへ
+  最初のリネームの前に事前確認（フォルダの書き込み権限・名前の長さ/文字・別ドライブ）を行い、
+  実行できない項目をまとめて標準エラーへ出す（その項目は実行しない。--strict なら何もリネームしない）
+- --profile で段階ごとの時間と件数を標準エラーへ出し ReNameTool_profile.jsonl に記録、--capture で cProfile を保存
+- 設定は GUI と同じ Settings の項目。--config で保存済みの ReNameTool_config.json も読める
+  （優先度：既定値 < 設定ファイル < コマンドライン）
+"""
+import argparse, csv, json, sys, threading, time
+from contextlib import nullcontext
+from dataclasses import fields
+from processor import Settings, RenamePlan, iter_plan, collect_dirs, iter_collect_entries, apply_plan, preflight
+from utils import path_sort_key, log_failures
+from config import ConfigStore
+from journal import RenameJournal
+from profiling import Profile, Capture, stage
+
+JOURNAL_FILE = "ReNameTool_journal.jsonl"   # gui_main と同じ
+CFG_KEY_SCOPE = "rename_scope"
+CFG_KEY_WORKERS = "rename_workers"
+
+METHODS = ["リネーム（置換）","エリア文字削除","連番","日付","フォルダ名追加","文字列追加","特定文字の移動/追加"]
+
+# GUI の初期値（gui_main._restore_settings の既定値と揃える）
+DEFAULTS = dict(
+    method="リネーム（置換）", target="", replacement="",
+    rename_second_active=False, target_second="", replacement_second="",
+    surrounded_start="", surrounded_end="",
+    sequence_digits=3, sequence_mode="フルリネーム",
+    date_mode="末尾に追加", date_type="作成日",
+    folder_name_position="先頭に追加", include_parent_folder=False,
+    include_subfolders=True, text_position="先頭に追加", add_text="",
+    include_extension=False,
+)
+
+def _opt(name: str) -> str:
+    return "--" + name.replace("_", "-")
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="renamer_cli", description="ReNameTool (headless)")
+    ap.add_argument("paths", nargs="*", help="対象のフォルダ/ファイル")
+    ap.add_argument("--config", help="GUI が保存した ReNameTool_config.json")
+    ap.add_argument("--scope", choices=["file", "folder"], help="リネーム対象（既定: file）")
+    ap.add_argument("--format", choices=["jsonl", "csv"], default="jsonl", help="出力形式")
+    ap.add_argument("-o", "--output", help="出力先（既定: 標準出力）")
+    ap.add_argument("--execute", action="store_true", help="実際にリネームする（省略時はドライラン）")
+    ap.add_argument("--workers", type=int, help="並列リネーム数（既定: 1）")
+    ap.add_argument("--strict", action="store_true", help="事前確認で実行できない項目があれば何もリネームしない")
+    ap.add_argument("--journal", default=JOURNAL_FILE, help="ジャーナルファイル")
+    ap.add_argument("--no-journal", action="store_true", help="ジャーナルを書かない（復旧/取り消し不可）")
+    ap.add_argument("--undo", action="store_true", help="直前のリネームを取り消す")
+    ap.add_argument("-q", "--quiet", action="store_true", help="進捗を表示しない")
+    ap.add_argument("--profile", action="store_true", help="段階ごとの時間と件数を表示・記録する")
+    ap.add_argument("--capture", action="store_true", help="詳細プロファイルを保存する（cProfile / pyinstrument）")
+
+    g = ap.add_argument_group("Settings")
+    for f in fields(Settings):
+        if f.type is bool:
+            g.add_argument(_opt(f.name), dest=f.name, action=argparse.BooleanOptionalAction, default=None)
+        elif f.name == "method":
+            g.add_argument(_opt(f.name), dest=f.name, choices=METHODS, default=None)
+        else:
+            g.add_argument(_opt(f.name), dest=f.name, type=f.type, default=None)
+    return ap
+
+def load_settings(args) -> tuple[Settings, dict]:
+    data = dict(DEFAULTS)
+    if args.config:
+        saved = ConfigStore(args.config).load()
+        if saved is None:
+            raise SystemExit(f"設定ファイルを読めません: {args.config}")
+        data.update(saved)
+    for f in fields(Settings):
+        v = getattr(args, f.name)
+        if v is not None: data[f.name] = v
+    return Settings.from_dict(data), data
+
+class _Writer:
+    # 1件ずつ書き出す（計画/結果を溜め込まない）
+    def __init__(self, out, fmt: str, columns: list[str]):
+        self.out, self.fmt, self.columns = out, fmt, columns
+        if fmt == "csv":
+            self._csv = csv.writer(out)
+            self._csv.writerow(columns)
+
+    def write(self, rec: dict):
+        if self.fmt == "csv":
+            self._csv.writerow(["" if rec.get(c) is None else rec.get(c) for c in self.columns])
+        else:
+            self.out.write(json.dumps({c: rec.get(c) for c in self.columns}, ensure_ascii=False) + "\n")
+
+class _Progress:
+    # apply_plan の progress コールバック（並列時は複数スレッドから呼ばれる）
+    def __init__(self, total: int, quiet: bool):
+        self.total, self.quiet = total, quiet
+        self.done = 0; self._last = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, n: int):
+        with self._lock:
+            self.done += n
+            now = time.monotonic()
+            if not self.quiet and (now - self._last >= 0.2 or self.done == self.total):
+                self._last = now
+                sys.stderr.write(f"\r実行中 {self.done}/{self.total}")
+                sys.stderr.flush()
+
+    def close(self):
+        if not self.quiet and self.total: sys.stderr.write("\n")
+
+def _targets(paths: list[str], st: Settings, scope: str, stream: bool = False, prof: Profile | None = None):
+    if scope == "folder":
+        return collect_dirs(paths)
+    entries = iter_collect_entries(paths, st.include_subfolders, prof=prof)
+    if stream and st.method != "連番":
+        return entries   # 走査順のまま流す（iter_plan がフォルダごとに名前順へ並べる）
+    return sorted(entries, key=lambda e: path_sort_key(e.path))
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    st, data = load_settings(args)
+    scope = args.scope or data.get(CFG_KEY_SCOPE, "file")
+    workers = args.workers or int(data.get(CFG_KEY_WORKERS, 1))
+    journal = None if args.no_journal else RenameJournal(args.journal)
+
+    if journal is not None and (args.execute or args.undo):
+        n = journal.recover()
+        if n and not args.quiet: print(f"前回中断したリネームを復旧しました（{n} 件）", file=sys.stderr)
+
+    out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    prof = Profile("cli_execute" if args.execute else "cli_plan") if args.profile and not args.undo else None
+    cap = Capture("cli") if args.capture else None
+    try:
+        with cap or nullcontext():
+            return _run(args, st, scope, workers, journal, out, prof)
+    finally:
+        if out is not sys.stdout: out.close()
+        _report_profile(prof, cap)
+
+def _run(args, st: Settings, scope: str, workers: int, journal, out, prof: Profile | None) -> int:
+    if args.undo:
+        if journal is None or not journal.can_undo():
+            print("取り消せるリネームがありません。", file=sys.stderr); return 1
+        results = journal.undo_last(workers=workers)
+        if results.failed_count: log_failures("undo", results.failures())
+        w = _Writer(out, args.format, ["old_path", "new_path", "ok", "error"])
+        for r in results: w.write(r)
+        return 0 if results.failed_count == 0 else 1
+
+    if not args.paths:
+        print("対象のパスを指定してください。", file=sys.stderr); return 2
+    if not args.execute:
+        w = _Writer(out, args.format, ["old_path", "new_path"])
+        # 計測時は段階を分けるため走査を先に済ませる（流したままだと走査と変換が混ざる）
+        with stage(prof, "scan"):
+            targets = _targets(args.paths, st, scope, stream=prof is None, prof=prof)
+        if prof is not None: prof.count("files", len(targets))
+        with stage(prof, "plan"):   # 書き出しも含む
+            for it in iter_plan(targets, st, scope, prof=prof):
+                w.write({"old_path": it.old_path, "new_path": it.new_path})
+        return 0
+
+    with stage(prof, "scan"):
+        targets = _targets(args.paths, st, scope, prof=prof)
+    with stage(prof, "plan"):
+        plan = RenamePlan(iter_plan(targets, st, scope, prof=prof))
+
+    blocked = preflight(plan, prof)
+    if blocked:
+        _report_blocked(plan, blocked)
+        if args.strict:
+            print("--strict のため何もリネームしません。", file=sys.stderr); return 1
+
+    prog = _Progress(len(plan), args.quiet)
+    try:
+        results = apply_plan(plan, workers=workers, journal=journal, progress=prog, prof=prof, blocked=blocked)
+    finally:
+        prog.close()
+    w = _Writer(out, args.format, ["old_path", "new_path", "ok", "error"])
+    for r in results: w.write(r)
+    ng = results.failed_count
+    if ng: log_failures("rename", results.failures())
+    if not args.quiet: print(f"完了：成功 {len(results) - ng} / 失敗 {ng}", file=sys.stderr)
+    return 0 if ng == 0 else 1
+
+BLOCKED_SHOWN = 20   # 事前確認で出す件数の上限（残りは件数だけ。全件は結果の error 列にある）
+
+def _report_blocked(plan: RenamePlan, blocked: dict[int, tuple[int, str]]):
+    # --quiet でも出す（実行前に分かる失敗なので）
+    print(f"事前確認：{len(blocked)} 件は実行できません", file=sys.stderr)
+    for i in sorted(blocked)[:BLOCKED_SHOWN]:
+        print(f"  {plan.old_path(i)} -> {plan.new_name(i)}: {blocked[i][1]}", file=sys.stderr)
+    if len(blocked) > BLOCKED_SHOWN:
+        print(f"  ほか {len(blocked) - BLOCKED_SHOWN} 件", file=sys.stderr)
+
+def _report_profile(prof: Profile | None, cap: Capture | None):
+    # 明示的に頼まれたものなので --quiet でも出す
+    if prof is not None:
+        prof.finish()
+        print(f"計測: {prof.summary()}", file=sys.stderr)
+        try:
+            prof.write_log()
+        except OSError as e:
+            print(f"計測ログを書けません: {e}", file=sys.stderr)
+    if cap is not None and cap.path:
+        print(f"詳細プロファイル: {cap.path}", file=sys.stderr)
+
+if __name__ == "__main__":
+    sys.exit(main())
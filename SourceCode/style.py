@@ -174,7 +174,7 @@ def build_qss(mode: str | None = None) -> str:
         padding: 2px;
     }}
 
-    QTableWidget {{
+    QTableView {{
         background: rgba(240,240,255,0.6);
         color: #000;   /* ★ 文字は黒 */
         gridline-color: #bfc7ff;
@@ -182,9 +182,20 @@ def build_qss(mode: str | None = None) -> str:
         selection-color: #000;
         alternate-background-color: rgba(240,240,255,0.35);
     }}
-    QTableWidget::item {{
+    QTableView::item {{
     color: #000;   /* ★ 各セルの文字も黒 */
     }}
+    /* 選択列のチェック（モデルの CheckStateRole を描画） */
+    QTableView::indicator {{
+        width: 16px; height: 16px;
+        border: 1px solid #888;
+        border-radius: 3px;
+        background-color: #444;
+    }}
+    QTableView::indicator:checked {{
+        background-color: {PRIMARY_COLOR};
+        border: 1px solid {PRIMARY_COLOR};
+    }}
     QHeaderView::section {{
         background: #e5ecff;
         color: #223;
@@ -1,12 +1,83 @@
-import os, sys
+import atexit, json, logging, os, queue, re, sys
+from collections.abc import Iterable
 from datetime import datetime
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 def resource_path(rel: str) -> str:
     base = getattr(sys, "_MEIPASS", os.path.abspath("."))
     return os.path.join(base, rel)
 
-def save_error_log(tag: str, message: str):
-    now = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    name = f"ReNameTool_error_{now}.log"
-    with open(name, "a", encoding="utf-8") as f:
-        f.write(f"[{now}] {tag}: {message}\n")
+# ---------- エラーログ ----------
+# 1つのファイル（ReNameTool_error.log）へ JSON Lines で追記し、大きくなったら世代を回す。
+# 書き込みは QueueListener のスレッドで行うので、呼び出し側（リネームのループなど）は待たない。
+ERROR_LOG_FILE = "ReNameTool_error.log"
+ERROR_LOG_MAX_BYTES = 1_000_000
+ERROR_LOG_BACKUPS = 3
+
+_LOG_FIELDS = ("stage", "path", "errno")
+_listener: QueueListener | None = None
+
+class _JsonLineFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        d = {"time": datetime.fromtimestamp(record.created).isoformat(timespec="seconds"), "level": record.levelname}
+        for k in _LOG_FIELDS:
+            v = getattr(record, k, None)
+            if v is not None: d[k] = v
+        d["message"] = record.getMessage()
+        return json.dumps(d, ensure_ascii=False)
+
+def error_logger() -> logging.Logger:
+    # 初回だけ キュー → 書き込みスレッド → ローテートするファイル をつなぐ（ファイルは最初の記録まで作らない）
+    global _listener
+    log = logging.getLogger("ReNameTool")
+    if _listener is None:
+        q = queue.SimpleQueue()
+        fh = RotatingFileHandler(ERROR_LOG_FILE, maxBytes=ERROR_LOG_MAX_BYTES, backupCount=ERROR_LOG_BACKUPS,
+                                 encoding="utf-8", delay=True)
+        fh.setFormatter(_JsonLineFormatter())
+        _listener = QueueListener(q, fh)
+        _listener.start()
+        atexit.register(_listener.stop)   # 終了時に残りを書き切る
+        log.addHandler(QueueHandler(q))
+        log.setLevel(logging.INFO)
+        log.propagate = False
+    return log
+
+def save_error_log(tag: str, message: str, path: str | None = None, errno: int | None = None):
+    error_logger().error(message, extra={"stage": tag, "path": path, "errno": errno})
+
+def log_failures(tag: str, failures: Iterable[tuple[str, "int | None", str]]) -> int:
+    """
+    まとめて失敗を記録する（RenameResults.failures() など (path, errno, エラー) の列）。
+    リネームが終わってから1回呼ぶ → ループの中では何もしない。記録した件数を返す
+    """
+    log = error_logger()
+    n = 0
+    for path, errno, message in failures:
+        log.error(message, extra={"stage": tag, "path": path, "errno": errno})
+        n += 1
+    return n
+
+_DIGITS = re.compile(r'\d+')
+
+def _encode_digits(m: re.Match) -> str:
+    n = str(int(m.group()))   # 先頭の0を除く（全角数字も半角に揃う）
+    return f"\0{chr(len(n))}{n}"
+
+@lru_cache(maxsize=1 << 16)
+def natural_key(text: str) -> str:
+    """
+    自然順ソートのキー（IMG_2 < IMG_10、大文字小文字は区別しない）。
+    文字列1本にまとめてあるので、そのまま < で比べられる（リストより小さく比較も速い）。
+      文字部分 → 小文字
+      数字部分 → "\0" + 桁数 + 数字
+    "\0" はどの文字より小さいので、[文字, 数値, 文字, …] のリストで比べたときと同じ順になる。
+    同じ文字列は何度も来る（ディレクトリ名など）のでキャッシュする。
+    """
+    return _DIGITS.sub(_encode_digits, text.lower())
+
+def path_sort_key(path: str) -> tuple[str, str, str]:
+    # 一覧の既定の並び：フォルダごとにまとめ、その中を自然順（IMG_1 / img_1 のような同順位はパスで決める）
+    d, name = os.path.split(path)
+    return natural_key(d), natural_key(name), path
@@ -0,0 +1,119 @@
+import os
+from PySide6.QtCore import QObject, QTimer, QFileSystemWatcher, Signal
+
+class FolderWatcher(QObject):
+    """
+    走査したフォルダを監視し、中身が変わったフォルダをまとめて通知する（フォルダ監視モード）。
+    - 通常は QFileSystemWatcher（OS の変更通知）
+    - 監視数が多すぎる / 登録に失敗したら、フォルダの mtime を定期的に stat するポーリングに切り替える
+    - dirty: 変わったフォルダのリスト（連続した変更は DEBOUNCE_MS 待ってまとめる）
+    差分（追加/削除）は受け取った側がそのフォルダだけ読み直して求める。
+    """
+    dirty = Signal(list)
+
+    DEBOUNCE_MS = 300
+    WATCH_MAX = 4096      # これを超えたらポーリング（OS の監視数上限・ハンドル消費を避ける）
+    POLL_MS = 2000
+    POLL_BATCH = 2000     # 1回のポーリングで stat するフォルダ数（GUI を止めない）
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._dirs: set[str] = set()
+        self._fs: QFileSystemWatcher | None = None
+        self._mtime: dict[str, int] | None = None   # ポーリング中：フォルダ → 前回の mtime
+        self._poll_queue: list[str] = []
+        self._pending: set[str] = set()
+        self._debounce = QTimer(self); self._debounce.setSingleShot(True); self._debounce.setInterval(self.DEBOUNCE_MS)
+        self._debounce.timeout.connect(self._flush)
+        self._poll = QTimer(self); self._poll.setInterval(self.POLL_MS)
+        self._poll.timeout.connect(self._poll_tick)
+
+    @property
+    def active(self) -> bool:
+        return bool(self._dirs)
+
+    @property
+    def polling(self) -> bool:
+        return self._mtime is not None
+
+    def dirs(self) -> set[str]:
+        return self._dirs
+
+    def watch(self, dirs):
+        # 監視対象を入れ替える
+        self.stop()
+        self.add_dirs(dirs)
+
+    def add_dirs(self, dirs):
+        new = [d for d in dict.fromkeys(dirs) if d not in self._dirs]
+        if not new: return
+        self._dirs.update(new)
+        if self._mtime is None and len(self._dirs) > self.WATCH_MAX:
+            self._start_polling()
+            return
+        if self._mtime is None:
+            if self._fs is None:
+                self._fs = QFileSystemWatcher(self)
+                self._fs.directoryChanged.connect(self._on_changed)
+            failed = self._fs.addPaths(new)
+            if failed:
+                self._start_polling()
+            return
+        for d in new:
+            self._mtime[d] = _mtime_of(d)
+
+    def remove_dirs(self, dirs):
+        gone = [d for d in dirs if d in self._dirs]
+        if not gone: return
+        self._dirs.difference_update(gone)
+        self._pending.difference_update(gone)
+        if self._mtime is not None:
+            for d in gone: self._mtime.pop(d, None)
+        elif self._fs is not None:
+            watched = set(self._fs.directories())
+            gone = [d for d in gone if d in watched]
+            if gone: self._fs.removePaths(gone)
+
+    def stop(self):
+        self._debounce.stop(); self._poll.stop()
+        if self._fs is not None:
+            self._fs.deleteLater(); self._fs = None
+        self._dirs = set(); self._mtime = None; self._poll_queue = []; self._pending = set()
+
+    # ----- 内部 -----
+    def _start_polling(self):
+        if self._fs is not None:
+            self._fs.deleteLater(); self._fs = None
+        self._mtime = {d: _mtime_of(d) for d in self._dirs}
+        self._poll_queue = []
+        self._poll.start()
+
+    def _on_changed(self, path: str):
+        if path in self._dirs:
+            self._pending.add(path)
+            self._debounce.start()
+
+    def _poll_tick(self):
+        if not self._poll_queue:
+            self._poll_queue = list(self._mtime)
+        batch, self._poll_queue = self._poll_queue[:self.POLL_BATCH], self._poll_queue[self.POLL_BATCH:]
+        mt = self._mtime
+        for d in batch:
+            if d not in mt: continue
+            m = _mtime_of(d)
+            if m != mt[d]:
+                mt[d] = m
+                self._pending.add(d)
+        if self._pending and not self._debounce.isActive():
+            self._debounce.start()
+
+    def _flush(self):
+        if not self._pending: return
+        dirs = sorted(self._pending); self._pending = set()
+        self.dirty.emit(dirs)
+
+def _mtime_of(d: str) -> int:
+    try:
+        return os.stat(d).st_mtime_ns
+    except OSError:
+        return -1   # 消えたフォルダ（次に現れたら変化として拾う）
@@ -1,9 +1,12 @@
 import os
-from PySide6.QtCore import Qt
+from bisect import bisect_left, bisect_right
+from itertools import compress
+from PySide6.QtCore import Qt, QAbstractTableModel, QAbstractProxyModel, QModelIndex, QPersistentModelIndex, QEvent, QRect
 from PySide6.QtWidgets import (
-    QLabel, QTableWidget, QTableWidgetItem, QAbstractItemView, QCheckBox,
-    QWidget, QHBoxLayout, QHeaderView
+    QLabel, QTableView, QAbstractItemView, QHeaderView, QStyledItemDelegate,
+    QStyleOptionViewItem, QStyle
 )
+from utils import natural_key, path_sort_key
 
 class DropArea(QLabel):
     def __init__(self, on_files_dropped, parent=None):
@@ -24,49 +27,509 @@ class DropArea(QLabel):
             self._callback(files)
             self.setText("受け取りました：\n" + "\n".join(files[-5:]))
 
-def _centered_checkbox(checked=True) -> QWidget:
-    w = QWidget()
-    lay = QHBoxLayout(w)
-    lay.setContentsMargins(0,0,0,0)
-    lay.setAlignment(Qt.AlignCenter)
-    cb = QCheckBox(); cb.setChecked(checked)
-    lay.addWidget(cb)
-    return w
-
-class RenameTable(QTableWidget):
-    VISIBLE_COLS = ["選択", "状態", "リネーム前", "リネーム後", "ディレクトリ"]
-    HIDDEN_COLS  = ["old_path", "new_path"]
-
-    COL_SELECT = 0
-    COL_STATUS = 1
-    COL_BEFORE = 2
-    COL_AFTER  = 3
-    COL_DIR    = 4
-    COL_OLD    = 5
-    COL_NEW    = 6
+
+# 列定義（モデル/ビュー共通）
+COL_SELECT = 0
+COL_STATUS = 1
+COL_BEFORE = 2
+COL_AFTER  = 3
+COL_DIR    = 4
+COL_OLD    = 5
+COL_NEW    = 6
+
+# 状態は 1 byte のコードで持つ（0=未実行 / 1=成功 / 2=失敗）
+STATUS_NONE, STATUS_OK, STATUS_NG = 0, 1, 2
+STATUS_TEXT = ("ー", "○", "✕")
+
+_ALIGN_CENTER = Qt.AlignCenter
+_ALIGN_LEFT   = Qt.AlignLeft | Qt.AlignVCenter
+
+class RenameModel(QAbstractTableModel):
+    """
+    行ごとのウィジェット/アイテムを持たない列指向ストア。
+    - パスは old/new の2列だけ保持し、表示名やディレクトリは data() で都度切り出す
+    - チェック/状態は bytearray（1行1byte）
+    - パス→行の索引を持ち、プレビュー/状態の反映は該当行だけを触る（全行走査しない）
+    → 描画は見えている行だけなので、100万行でも読み込みは数秒
+    """
+    HEADERS = ["選択", "状態", "リネーム前", "リネーム後", "ディレクトリ", "old_path", "new_path"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._old: list[str] = []
+        self._new: list[str] = []
+        self._checked = bytearray()
+        self._status = bytearray()
+        self._row: dict[str, int] = {}          # old_path → 行
+        self._dup_rows: dict[str, list[int]] = {}  # 同じパスが複数行あるときの残りの行（通常は空）
+        self._sort_keys: dict[int, list] = {}      # 列 → 行ごとのソートキー（作った列だけ。行の並び替えに追従）
+
+    # ----- Qt モデル実装 -----
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._old)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation != Qt.Horizontal:
+            return None
+        if role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        if role == Qt.TextAlignmentRole:
+            return _ALIGN_CENTER if section in (COL_SELECT, COL_STATUS) else _ALIGN_LEFT
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        r, c = index.row(), index.column()
+        if role == Qt.DisplayRole:
+            if c == COL_STATUS: return STATUS_TEXT[self._status[r]]
+            if c == COL_BEFORE: return os.path.basename(self._old[r])
+            if c == COL_AFTER:  return os.path.basename(self._new[r]) if self._new[r] else ""
+            if c == COL_DIR:    return os.path.dirname(self._old[r])
+            if c == COL_OLD:    return self._old[r]
+            if c == COL_NEW:    return self._new[r]
+            return None
+        if role == Qt.CheckStateRole and c == COL_SELECT:
+            return Qt.Checked if self._checked[r] else Qt.Unchecked
+        if role == Qt.TextAlignmentRole:
+            return _ALIGN_CENTER if c in (COL_SELECT, COL_STATUS) else _ALIGN_LEFT
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        f = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if index.column() == COL_SELECT:
+            f |= Qt.ItemIsUserCheckable
+        return f
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.CheckStateRole or not index.isValid() or index.column() != COL_SELECT:
+            return False
+        self._checked[index.row()] = 1 if Qt.CheckState(value) == Qt.Checked else 0
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        return True
+
+    # ----- 列ストア操作 -----
+    def load_paths(self, paths: list[str]):
+        self.beginResetModel()
+        self._old = list(paths)
+        self._new = [""] * len(self._old)
+        self._checked = bytearray(b"\x01") * len(self._old)
+        self._status = bytearray(len(self._old))
+        self._reindex()
+        self._sort_keys = {}
+        self.endResetModel()
+
+    def clear(self):
+        self.load_paths([])
+
+    def append_paths(self, paths: list[str]):
+        # 走査中のストリーム追加用（末尾に挿入するだけ）
+        if not paths: return
+        first = len(self._old)
+        self.beginInsertRows(QModelIndex(), first, first + len(paths) - 1)
+        self._old.extend(paths)
+        self._new.extend([""] * len(paths))
+        self._checked.extend(b"\x01" * len(paths))
+        self._status.extend(bytes(len(paths)))
+        for r, p in enumerate(paths, start=first):
+            self._index_add(p, r)
+        for col, keys in self._sort_keys.items():
+            keys.extend(self._sort_key_of(col, r) for r in range(first, len(self._old)))
+        self.endInsertRows()
+
+    def remove_paths(self, paths) -> int:
+        # 消えたファイルの行を取り除く（フォルダ監視用）。連続する行はまとめて、下から消す
+        rows = self.rows_for(paths)
+        if not rows: return 0
+        blocks: list[list[int]] = []
+        for r in rows:
+            if blocks and blocks[-1][1] == r - 1: blocks[-1][1] = r
+            else: blocks.append([r, r])
+        for first, last in reversed(blocks):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            sl = slice(first, last + 1)
+            del self._old[sl], self._new[sl], self._checked[sl], self._status[sl]
+            for keys in self._sort_keys.values(): del keys[sl]
+            self.endRemoveRows()
+        # 消した行より後ろの行番号だけ詰め直す
+        if self._dup_rows:
+            self._reindex()
+        else:
+            row = self._row
+            for p in paths: row.pop(p, None)
+            for r in range(rows[0], len(self._old)):
+                row[self._old[r]] = r
+        return len(rows)
+
+    def sort_by_path(self):
+        keys = list(map(path_sort_key, self._old))
+        perm = sorted(range(len(keys)), key=keys.__getitem__)
+        if any(i != r for r, i in enumerate(perm)):
+            self.reorder(perm)
+
+    def old_path(self, row: int) -> str: return self._old[row]
+    def new_path(self, row: int) -> str: return self._new[row]
+    def is_checked(self, row: int) -> bool: return bool(self._checked[row])
+
+    def rows_for(self, paths) -> list[int]:
+        # 該当行を行番号順に返す（一覧に無いパスは無視）
+        get, dups = self._row.get, self._dup_rows
+        rows = [r for r in map(get, paths) if r is not None]
+        if dups:
+            for p in paths:
+                rows.extend(dups.get(p, ()))
+            rows = sorted(set(rows))
+        else:
+            rows.sort()
+        return rows
+
+    def checked_paths(self) -> list[str]:
+        return [p for p, c in zip(self._old, self._checked) if c]
+
+    def set_checked_rows(self, rows, checked: bool):
+        rows = list(rows)
+        if not rows: return
+        v = 1 if checked else 0
+        for r in rows:
+            self._checked[r] = v
+        self._emit_rows_changed(min(rows), max(rows), COL_SELECT, COL_SELECT)
+
+    def set_new_paths(self, mapping: dict[str, str]):
+        touched = self.rows_for(mapping)
+        for r in touched:
+            self._new[r] = mapping[self._old[r]]
+        if touched:
+            self._refresh_sort_keys(touched, (COL_AFTER, COL_NEW))
+            self._emit_rows_changed(touched[0], touched[-1], COL_AFTER, COL_NEW)
+
+    def set_status(self, ok_map: dict[str, bool]):
+        touched = self.rows_for(ok_map)
+        for r in touched:
+            self._status[r] = STATUS_OK if ok_map[self._old[r]] else STATUS_NG
+        if touched:
+            self._refresh_sort_keys(touched, (COL_STATUS,))
+            self._emit_rows_changed(touched[0], touched[-1], COL_STATUS, COL_STATUS)
+
+    def roll_forward(self, moved: dict[str, str]):
+        # 実行結果 old→new を「リネーム前」に繰上げ、プレビュー列は空に戻す
+        # 連鎖（a→b, b→c）があるので、索引は全行の旧パスを外してから新パスを入れる
+        touched = self.rows_for(moved)
+        for r in touched:
+            self._index_discard(self._old[r], r)
+        for r in touched:
+            self._old[r] = moved[self._old[r]]
+            self._new[r] = ""
+            self._index_add(self._old[r], r)
+        if touched:
+            self._refresh_sort_keys(touched, (COL_BEFORE, COL_AFTER, COL_DIR, COL_OLD, COL_NEW))
+            self._emit_rows_changed(touched[0], touched[-1], COL_BEFORE, COL_NEW)
+
+    def reorder(self, perm: list[int]):
+        # perm[新しい行] = 元の行。行の並びを置換し、選択などの永続インデックスも追従させる
+        self.layoutAboutToBeChanged.emit()
+        self._old = [self._old[i] for i in perm]
+        self._new = [self._new[i] for i in perm]
+        self._checked = bytearray(map(self._checked.__getitem__, perm))
+        self._status = bytearray(map(self._status.__getitem__, perm))
+        self._sort_keys = {col: [keys[i] for i in perm] for col, keys in self._sort_keys.items()}
+        if self._dup_rows:
+            self._reindex()
+        else:
+            # パスの集合は変わらないので、既存の索引の行番号だけ書き換える
+            row = self._row
+            for r, p in enumerate(self._old):
+                row[p] = r
+        old_idx = self.persistentIndexList()
+        if old_idx:
+            pos = [0] * len(perm)
+            for new_row, old_row in enumerate(perm):
+                pos[old_row] = new_row
+            self.changePersistentIndexList(old_idx, [self.index(pos[i.row()], i.column()) for i in old_idx])
+        self.layoutChanged.emit()
+
+    # ----- ソート -----
+    def sort_rows(self, col: int, ascending: bool = True):
+        """
+        列の値で行を並べ替える（行の置換だけ。セルの作り直しはしない）。
+        キーは列ごとに1回だけ作って保持し、以後は変わった行だけ作り直す。
+        同じキーの行は元の並びを保つ（安定ソート）。
+        """
+        n = len(self._old)
+        if col == COL_SELECT:
+            keys = self._checked   # 0/1 をそのまま比べる
+        else:
+            keys = self._sort_keys.get(col)
+            if keys is None:
+                src, fns = self._key_spec(col)
+                it = iter(src)
+                for f in fns: it = map(f, it)
+                keys = self._sort_keys[col] = list(it)
+        perm = sorted(range(n), key=keys.__getitem__, reverse=not ascending)
+        self.reorder(perm)
+
+    def _key_spec(self, col: int):
+        # 列のキー = 元の列の値に fns を順に適用したもの
+        base, dirname = os.path.basename, os.path.dirname
+        if col == COL_STATUS: return self._status, (STATUS_TEXT.__getitem__,)
+        if col == COL_BEFORE: return self._old, (base, natural_key)
+        if col == COL_AFTER:  return self._new, (base, natural_key)
+        if col == COL_DIR:    return self._old, (dirname, natural_key)
+        if col == COL_OLD:    return self._old, (str.lower,)
+        return self._new, (str.lower,)
+
+    def _sort_key_of(self, col: int, row: int):
+        src, fns = self._key_spec(col)
+        v = src[row]
+        for f in fns: v = f(v)
+        return v
+
+    def _refresh_sort_keys(self, rows: list[int], cols):
+        for col in cols:
+            keys = self._sort_keys.get(col)
+            if keys is None: continue
+            for r in rows:
+                keys[r] = self._sort_key_of(col, r)
+
+    # ----- パス→行の索引 -----
+    def _reindex(self):
+        old = self._old
+        self._row = dict(zip(old, range(len(old))))
+        self._dup_rows = {}
+        if len(self._row) != len(old):
+            # 重複パスあり：索引には先頭の行、残りは _dup_rows へ
+            self._row = {}
+            for r, p in enumerate(old):
+                self._index_add(p, r)
+
+    def _index_add(self, path: str, row: int):
+        if self._row.setdefault(path, row) != row:
+            self._dup_rows.setdefault(path, []).append(row)
+
+    def _index_discard(self, path: str, row: int):
+        dup = self._dup_rows.get(path)
+        if self._row.get(path) == row:
+            if dup:
+                self._row[path] = dup.pop(0)
+                if not dup: del self._dup_rows[path]
+            else:
+                del self._row[path]
+        elif dup and row in dup:
+            dup.remove(row)
+            if not dup: del self._dup_rows[path]
+
+    def _emit_rows_changed(self, top: int, bottom: int, left: int, right: int):
+        self.dataChanged.emit(self.index(top, left), self.index(bottom, right))
+
+class CheckedOnlyProxy(QAbstractProxyModel):
+    """
+    「選択のみ表示」用の薄いプロキシ（行ごとの setRowHidden をやめる）。
+    - 絞り込みなし：行番号はソースと同じ（対応表を持たない）
+    - 絞り込みあり：チェック済みのソース行番号の昇順配列（チェックの bytearray から compress で一括生成）
+    絞り込みの対象は apply() した時点のチェック状態で決まる。チェックを外した行も次の apply() までは表示したまま。
+    ソースの並び替え（layoutChanged）では、その時点のチェック状態で絞り込み直す。
+    """
+    def __init__(self, source: RenameModel, parent=None):
+        super().__init__(parent)
+        self._rows: list[int] | None = None   # None = 絞り込みなし
+        self._count = source.rowCount()       # 絞り込みなしのときの行数（挿入通知の前後で食い違わないよう自前で持つ）
+        self._saved: list = []
+        self._removing = (0, 0, 0)
+        self.setSourceModel(source)
+        source.modelAboutToBeReset.connect(self.beginResetModel)
+        source.modelReset.connect(self._on_source_reset)
+        source.layoutAboutToBeChanged.connect(self._on_source_layout_about)
+        source.layoutChanged.connect(self._on_source_layout_changed)
+        source.rowsInserted.connect(self._on_source_rows_inserted)
+        source.rowsAboutToBeRemoved.connect(self._on_source_rows_about_removed)
+        source.rowsRemoved.connect(self._on_source_rows_removed)
+        source.dataChanged.connect(self._on_source_data_changed)
+
+    @property
+    def filtering(self) -> bool:
+        return self._rows is not None
+
+    def _checked_rows(self) -> list[int]:
+        src = self.sourceModel()
+        return list(compress(range(src.rowCount()), src._checked))
+
+    # ----- Qt プロキシ実装 -----
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid(): return 0
+        return self._count if self._rows is None else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.sourceModel().columnCount()
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not (0 <= row < self.rowCount()) or not (0 <= column < self.columnCount()):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid(): return QModelIndex()
+        r = proxy_index.row()
+        return self.sourceModel().index(r if self._rows is None else self._rows[r], proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid(): return QModelIndex()
+        r = source_index.row()
+        if self._rows is not None:
+            i = bisect_left(self._rows, r)
+            if i == len(self._rows) or self._rows[i] != r: return QModelIndex()
+            r = i
+        return self.index(r, source_index.column())
+
+    def source_rows(self, top: int, bottom: int):
+        # 表示行 top..bottom に対応するソース行
+        return range(top, bottom + 1) if self._rows is None else self._rows[top:bottom + 1]
+
+    # ----- 絞り込み -----
+    def apply(self, checked_only: bool):
+        rows = self._checked_rows() if checked_only else None
+        if rows == self._rows:
+            return
+        # 選択・カレント行は（表示に残るものだけ）引き継ぐ
+        self.layoutAboutToBeChanged.emit()
+        old = self.persistentIndexList()
+        src = [self.mapToSource(i) for i in old]
+        self._rows = rows
+        self._count = self.sourceModel().rowCount()
+        self.changePersistentIndexList(old, [self.mapFromSource(i) for i in src])
+        self.layoutChanged.emit()
+
+    # ----- ソースの変更を中継 -----
+    def _on_source_reset(self):
+        self._count = self.sourceModel().rowCount()
+        if self._rows is not None: self._rows = self._checked_rows()
+        self.endResetModel()
+
+    def _on_source_layout_about(self):
+        self.layoutAboutToBeChanged.emit()
+        old = self.persistentIndexList()
+        self._saved = [(i, QPersistentModelIndex(self.mapToSource(i))) for i in old]
+
+    def _on_source_layout_changed(self):
+        if self._rows is not None: self._rows = self._checked_rows()
+        saved, self._saved = self._saved, []
+        self.changePersistentIndexList([i for i, _ in saved],
+                                       [self.mapFromSource(QModelIndex(p)) for _, p in saved])
+        self.layoutChanged.emit()
+
+    def _on_source_rows_inserted(self, parent, first: int, last: int):
+        # ソースは末尾への追加のみ。追加行はチェック済みなので絞り込み中も末尾に出す
+        if self._rows is None:
+            self.beginInsertRows(QModelIndex(), first, last)
+            self._count = self.sourceModel().rowCount()
+            self.endInsertRows()
+            return
+        checked = self.sourceModel()._checked
+        add = [r for r in range(first, last + 1) if checked[r]]
+        if not add: return
+        n = len(self._rows)
+        self.beginInsertRows(QModelIndex(), n, n + len(add) - 1)
+        self._rows.extend(add)
+        self.endInsertRows()
+
+    def _on_source_rows_about_removed(self, parent, first: int, last: int):
+        if self._rows is None:
+            self.beginRemoveRows(QModelIndex(), first, last)
+            return
+        i, j = bisect_left(self._rows, first), bisect_right(self._rows, last)
+        self._removing = (i, j, last - first + 1)
+        if i < j: self.beginRemoveRows(QModelIndex(), i, j - 1)
+
+    def _on_source_rows_removed(self, parent, first: int, last: int):
+        if self._rows is None:
+            self._count = self.sourceModel().rowCount()
+            self.endRemoveRows()
+            return
+        # 消えた範囲を落とし、後ろの行番号を詰める
+        i, j, k = self._removing
+        rows = self._rows
+        rows[i:] = [r - k for r in rows[j:]]
+        if i < j: self.endRemoveRows()
+
+    def _on_source_data_changed(self, top_left, bottom_right, roles=()):
+        top, bottom = top_left.row(), bottom_right.row()
+        if self._rows is not None:
+            top = bisect_left(self._rows, top)
+            bottom = bisect_right(self._rows, bottom) - 1
+            if top > bottom: return
+        self.dataChanged.emit(self.index(top, top_left.column()), self.index(bottom, bottom_right.column()), roles)
+
+class _CenteredCheckDelegate(QStyledItemDelegate):
+    # 選択列：チェックをセル中央に描画し、セル内クリックでトグル
+    def _indicator_rect(self, opt) -> QRect:
+        style = opt.widget.style() if opt.widget else None
+        w = style.pixelMetric(QStyle.PM_IndicatorWidth, opt, opt.widget) if style else 16
+        h = style.pixelMetric(QStyle.PM_IndicatorHeight, opt, opt.widget) if style else 16
+        r = QRect(0, 0, w, h); r.moveCenter(opt.rect.center())
+        return r
+
+    def paint(self, painter, option, index):
+        opt = QStyleOptionViewItem(option)
+        self.initStyleOption(opt, index)
+        style = opt.widget.style() if opt.widget else None
+        if style is None:
+            return super().paint(painter, option, index)
+        state = opt.checkState
+        opt.features &= ~QStyleOptionViewItem.HasCheckIndicator
+        style.drawControl(QStyle.CE_ItemViewItem, opt, painter, opt.widget)
+        opt.rect = self._indicator_rect(opt)
+        opt.state = (opt.state & ~(QStyle.State_On | QStyle.State_Off)) | (QStyle.State_On if state == Qt.Checked else QStyle.State_Off)
+        style.drawPrimitive(QStyle.PE_IndicatorItemViewItemCheck, opt, painter, opt.widget)
+
+    def editorEvent(self, event, model, option, index):
+        if not (index.flags() & Qt.ItemIsUserCheckable):
+            return False
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            cur = index.data(Qt.CheckStateRole)
+            return model.setData(index, Qt.Unchecked if cur == Qt.Checked else Qt.Checked, Qt.CheckStateRole)
+        if event.type() in (QEvent.MouseButtonPress, QEvent.MouseButtonDblClick):
+            return True  # 押下はリリース側でまとめて処理
+        return False
+
+class RenameTable(QTableView):
+    VISIBLE_COLS = RenameModel.HEADERS[:5]
+    HIDDEN_COLS  = RenameModel.HEADERS[5:]
+
+    COL_SELECT = COL_SELECT
+    COL_STATUS = COL_STATUS
+    COL_BEFORE = COL_BEFORE
+    COL_AFTER  = COL_AFTER
+    COL_DIR    = COL_DIR
+    COL_OLD    = COL_OLD
+    COL_NEW    = COL_NEW
 
     def __init__(self, parent=None):
-        super().__init__(0, len(self.VISIBLE_COLS) + len(self.HIDDEN_COLS), parent)
-        self.setHorizontalHeaderLabels(self.VISIBLE_COLS + self.HIDDEN_COLS)
+        super().__init__(parent)
+        self.source = RenameModel(self)
+        self.proxy = CheckedOnlyProxy(self.source, self)
+        self.setModel(self.proxy)
+        self.setItemDelegateForColumn(self.COL_SELECT, _CenteredCheckDelegate(self))
         self.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.setAlternatingRowColors(True)
-        self.verticalHeader().setDefaultSectionSize(32)
+        self.setWordWrap(False)
+
+        # 行高は固定（可変だと全行の高さ計算が走る）
+        vh = self.verticalHeader()
+        vh.setSectionResizeMode(QHeaderView.Fixed)
+        vh.setDefaultSectionSize(32)
 
         # 列幅: ユーザー操作可
         hdr = self.horizontalHeader()
         hdr.setSectionResizeMode(QHeaderView.Interactive)
         hdr.setStretchLastSection(False)
-
-        # ヘッダの文字揃え
-        for col in range(len(self.VISIBLE_COLS)):
-            item = self.horizontalHeaderItem(col)
-            if not item:
-                continue
-            if col in (self.COL_SELECT, self.COL_STATUS):
-                item.setTextAlignment(Qt.AlignCenter)
-            else:
-                item.setTextAlignment(Qt.AlignLeft | Qt.AlignVCenter)
+        hdr.setSectionsClickable(True)
 
         # クリックソート（本体は gui_main 側で制御）
         self.setSortingEnabled(False)
@@ -82,84 +545,58 @@ class RenameTable(QTableWidget):
         self.setColumnWidth(self.COL_AFTER,  260)
         self.setColumnWidth(self.COL_DIR,    360)
 
+    def row_count(self) -> int:
+        return self.source.rowCount()
+
+    def old_path(self, row: int) -> str: return self.source.old_path(row)
+    def new_path(self, row: int) -> str: return self.source.new_path(row)
+    def is_checked(self, row: int) -> bool: return self.source.is_checked(row)
+
     def clear_rows(self):
-        self.setRowCount(0)
+        self.source.clear()
 
     def load_list_only(self, file_paths: list[str]):
-        self.clear_rows()
-        for p in file_paths:
-            row = self.rowCount()
-            self.insertRow(row)
+        self.source.load_paths(file_paths)
 
-            before = os.path.basename(p)
-            directory = os.path.dirname(p)
+    def append_list_only(self, file_paths: list[str]):
+        self.source.append_paths(file_paths)
 
-            self.setCellWidget(row, self.COL_SELECT, _centered_checkbox(True))
+    def remove_list_only(self, file_paths) -> int:
+        return self.source.remove_paths(file_paths)
 
-            st = QTableWidgetItem("ー"); st.setTextAlignment(Qt.AlignCenter)
-            self.setItem(row, self.COL_STATUS, st)
+    def sort_by_path(self):
+        self.source.sort_by_path()
 
-            self.setItem(row, self.COL_BEFORE, QTableWidgetItem(before))
-            self.setItem(row, self.COL_AFTER,  QTableWidgetItem(""))
-            self.setItem(row, self.COL_DIR,    QTableWidgetItem(directory))
+    def apply_preview_result(self, plan_items: list[dict]):
+        self.source.set_new_paths({d["old_path"]: d["new_path"] for d in plan_items})
 
-            self.setItem(row, self.COL_OLD, QTableWidgetItem(p))
-            self.setItem(row, self.COL_NEW, QTableWidgetItem(""))
+    def update_status(self, results):
+        # results: processor.RenameResults
+        self.source.set_status({results.old_path(i): results.ok(i) for i in range(len(results))})
 
-    def apply_preview_result(self, plan_items: list[dict]):
-        mapping = {d["old_path"]: d["new_path"] for d in plan_items}
-        for r in range(self.rowCount()):
-            oldp = self.item(r, self.COL_OLD).text()
-            if oldp in mapping:
-                newp = mapping[oldp]
-                new_name = os.path.basename(newp)
-                self.item(r, self.COL_NEW).setText(newp)
-                self.item(r, self.COL_AFTER).setText(new_name)
-                self.item(r, self.COL_AFTER).setTextAlignment(Qt.AlignLeft | Qt.AlignVCenter)
-
-    def update_status(self, results: list[dict]):
-        status_map = {d["old_path"]: ("○" if d.get("ok") else "✕") for d in results}
-        for r in range(self.rowCount()):
-            oldp = self.item(r, self.COL_OLD).text()
-            if oldp in status_map:
-                it = self.item(r, self.COL_STATUS)
-                it.setText(status_map[oldp])
-                it.setTextAlignment(Qt.AlignCenter)
-
-    def _row_checkbox(self, row: int) -> QCheckBox | None:
-        cell = self.cellWidget(row, self.COL_SELECT)
-        if not cell: return None
-        if cell.layout() and cell.layout().count():
-            w = cell.layout().itemAt(0).widget()
-            if isinstance(w, QCheckBox):
-                return w
-        return None
+    def roll_forward(self, results):
+        self.source.roll_forward(dict(results.moved()))
 
     def checked_old_paths(self) -> list[str]:
-        out = []
-        for r in range(self.rowCount()):
-            cb = self._row_checkbox(r)
-            if cb and cb.isChecked():
-                out.append(self.item(r, self.COL_OLD).text())
-        return out
+        return self.source.checked_paths()
 
     def rows_for_paths(self, paths: list[str]) -> list[int]:
-        wanted = set(paths)
-        rows = []
-        for r in range(self.rowCount()):
-            if self.item(r, self.COL_OLD).text() in wanted:
-                rows.append(r)
-        return rows
+        return self.source.rows_for(paths)
+
+    def set_checked_only(self, on: bool):
+        self.proxy.apply(on)
+
+    def selected_source_rows(self) -> list[int]:
+        # 選択範囲（表示行）→ ソース行。行インデックスを1つずつ作らない
+        out: list[int] = []
+        for rg in self.selectionModel().selection():
+            out.extend(self.proxy.source_rows(rg.top(), rg.bottom()))
+        return out
 
     # ▼ 追加：Delキーで選択行を除外（チェックOFF）
     def keyPressEvent(self, e):
         if e.key() in (Qt.Key_Delete, Qt.Key_Backspace):
-            ranges = self.selectedRanges()
-            for rg in ranges:
-                for r in range(rg.topRow(), rg.bottomRow() + 1):
-                    cb = self._row_checkbox(r)
-                    if cb:
-                        cb.setChecked(False)
+            self.source.set_checked_rows(self.selected_source_rows(), False)
             e.accept()
             return
         super().keyPressEvent(e)
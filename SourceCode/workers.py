@@ -0,0 +1,117 @@
+import time
+from contextlib import nullcontext
+from PySide6.QtCore import QThread, Signal
+from processor import FileEntry, Settings, TransformCache, iter_collect_entries, iter_plan, PlanCancelled
+from profiling import Profile, Capture, stage
+
+class ScanWorker(QThread):
+    """
+    ドロップされたパスをバックグラウンドで走査し、見つけた順に小分けで流す。
+    - batch: 見つかった FileEntry のリスト（GUI側でテーブル末尾に追加）
+    - progress: ここまでの件数
+    - failed: 走査中の例外メッセージ
+    - done: 走査終了（True=中止された）
+    読めたフォルダは dirs に残る（done 後に参照。フォルダ監視用）
+    prof: profiling.Profile（省略可）。走査の時間・件数・フォルダ数・OS 呼び出しを記録
+    """
+    batch = Signal(list)
+    progress = Signal(int)
+    failed = Signal(str)
+    done = Signal(bool)
+
+    FLUSH_SEC = 0.03     # 最初の行は数十ms以内に出す
+    BATCH_MAX = 5000     # 1回で流す最大件数（GUI側の挿入コストを抑える）
+
+    def __init__(self, paths: list[str], include_subfolders: bool, cache=None, prof: Profile | None = None, parent=None):
+        super().__init__(parent)
+        self._paths = list(paths)
+        self._include_subfolders = include_subfolders
+        self._cache = cache   # ListingCache（省略可）
+        self._prof = prof
+        self.dirs: list[str] = []
+
+    def run(self):
+        buf: list[FileEntry] = []
+        total = 0
+        last = time.monotonic()
+        cancelled = False
+        prof = self._prof
+        try:
+            with stage(prof, "scan"), (self._cache.session() if self._cache is not None else nullcontext()) as listing:
+                for e in iter_collect_entries(self._paths, self._include_subfolders, listing, self.dirs, prof):
+                    buf.append(e)
+                    now = time.monotonic()
+                    if len(buf) >= self.BATCH_MAX or now - last >= self.FLUSH_SEC:
+                        if self.isInterruptionRequested():
+                            cancelled = True; buf = []; break
+                        total += len(buf)
+                        self.batch.emit(buf); self.progress.emit(total)
+                        buf = []; last = now
+            if buf and not self.isInterruptionRequested():
+                total += len(buf)
+                self.batch.emit(buf); self.progress.emit(total)
+        except Exception as e:
+            self.failed.emit(str(e))
+        finally:
+            if prof is not None:
+                prof.count("files", total); prof.count("dirs", len(self.dirs))
+            self.done.emit(cancelled or self.isInterruptionRequested())
+
+class PreviewWorker(QThread):
+    """
+    プレビュー（リネーム計画）をバックグラウンドで計算し、小分けでテーブルへ流す。
+    gen は開始時の世代番号。設定が変わって新しいプレビューが始まったら、
+    古いワーカーは requestInterruption() で打ち切り、GUI側も gen で古い通知を捨てる。
+    - chunk: (gen, [{"old_path", "new_path"}, ...])
+    - failed: (gen, 例外メッセージ)
+    - done: (gen, 計画の件数, 中止されたか)
+    prof: profiling.Profile（省略可）。計画（変換＋衝突解決）の時間と件数を記録
+    capture: True なら cProfile / pyinstrument で詳細を取り、保存先を captured に残す（done 後に参照）
+    """
+    chunk = Signal(int, list)
+    failed = Signal(int, str)
+    done = Signal(int, int, bool)
+
+    CHUNK = 2000
+
+    def __init__(self, gen: int, targets: list[FileEntry], st: Settings, scope: str,
+                 cache: TransformCache | None = None, prof: Profile | None = None, capture: bool = False, parent=None):
+        super().__init__(parent)
+        self.gen = gen
+        self._targets = targets
+        self._st = st
+        self._scope = scope
+        self._cache = cache
+        self._prof = prof
+        self._capture = capture
+        self.captured: str | None = None
+
+    def run(self):
+        count = 0
+        cancelled = False
+        prof = self._prof
+        cap = Capture("preview") if self._capture else nullcontext()
+        try:
+            with cap, stage(prof, "plan"):
+                # 計画はディレクトリ単位で流れてくるので、全体を待たずに CHUNK 件ずつ送る
+                part: list[dict] = []
+                for it in iter_plan(self._targets, self._st, self._scope,
+                                    cancelled=self.isInterruptionRequested, cache=self._cache, prof=prof):
+                    part.append({"old_path": it.old_path, "new_path": it.new_path})
+                    if len(part) >= self.CHUNK:
+                        if self.isInterruptionRequested():
+                            cancelled = True; break
+                        count += len(part)
+                        self.chunk.emit(self.gen, part)
+                        part = []
+                if part and not cancelled and not self.isInterruptionRequested():
+                    count += len(part)
+                    self.chunk.emit(self.gen, part)
+        except PlanCancelled:
+            cancelled = True
+        except Exception as e:
+            self.failed.emit(self.gen, str(e))
+        finally:
+            if self._capture: self.captured = cap.path
+            if prof is not None: prof.count("files", len(self._targets))
+            self.done.emit(self.gen, count, cancelled or self.isInterruptionRequested())
@@ -0,0 +1,77 @@
+import os, sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "SourceCode"))
+from processor import RenamePlan, RenameItem, apply_plan
+from journal import RenameJournal
+
+class Crash(BaseException):
+    """プロセスの異常終了の代わり（apply_plan の except Exception では止まらない）"""
+
+def _files(d) -> dict[str, str]:
+    return {n: open(os.path.join(d, n), encoding="utf-8").read() for n in sorted(os.listdir(d))}
+
+def _crash_on_rename(monkeypatch, nth: int):
+    real, calls = os.rename, [0]
+    def rename(src, dst):
+        calls[0] += 1
+        if calls[0] == nth: raise Crash()
+        real(src, dst)
+    monkeypatch.setattr(os, "rename", rename)
+    return real
+
+def _run_crashing(tmp_path, monkeypatch, moves: list[tuple[str, str]], nth: int) -> RenameJournal:
+    d = tmp_path / "files"
+    plan = RenamePlan(RenameItem(str(d / a), str(d / b)) for a, b in moves)
+    journal = RenameJournal(str(tmp_path / "journal.jsonl"))
+    real = _crash_on_rename(monkeypatch, nth)
+    with pytest.raises(Crash):
+        apply_plan(plan, journal=journal)
+    monkeypatch.setattr(os, "rename", real)
+    return RenameJournal(str(tmp_path / "journal.jsonl"))
+
+@pytest.fixture
+def abc(tmp_path):
+    d = tmp_path / "files"; d.mkdir()
+    for n in "abc":
+        (d / n).write_text(n, encoding="utf-8")
+    return d
+
+CYCLE = [("a", "b"), ("b", "c"), ("c", "a")]
+
+@pytest.mark.parametrize("nth", [1, 2, 3, 4])
+def test_recover_rolls_back_interrupted_cycle(tmp_path, monkeypatch, abc, nth):
+    journal = _run_crashing(tmp_path, monkeypatch, CYCLE, nth)
+    journal.recover()
+    assert _files(abc) == {"a": "a", "b": "b", "c": "c"}
+    assert not journal.can_undo()
+    assert journal.recover() == 0
+
+def test_recover_rolls_back_chain(tmp_path, monkeypatch, abc):
+    journal = _run_crashing(tmp_path, monkeypatch, [("a", "x"), ("b", "a"), ("c", "b")], 3)
+    assert journal.recover() == 2
+    assert _files(abc) == {"a": "a", "b": "b", "c": "c"}
+
+def test_recover_resumes_after_crash_during_recovery(tmp_path, monkeypatch, abc):
+    journal = _run_crashing(tmp_path, monkeypatch, CYCLE, 3)
+    real = _crash_on_rename(monkeypatch, 2)
+    with pytest.raises(Crash):
+        journal.recover()
+    monkeypatch.setattr(os, "rename", real)
+    RenameJournal(journal.path).recover()
+    assert _files(abc) == {"a": "a", "b": "b", "c": "c"}
+
+def test_interrupted_undo_keeps_rename_undoable(tmp_path, monkeypatch, abc):
+    journal = RenameJournal(str(tmp_path / "journal.jsonl"))
+    apply_plan(RenamePlan(RenameItem(str(abc / a), str(abc / b)) for a, b in CYCLE), journal=journal)
+    assert _files(abc) == {"a": "c", "b": "a", "c": "b"}
+    real = _crash_on_rename(monkeypatch, 3)
+    with pytest.raises(Crash):
+        journal.undo_last()
+    monkeypatch.setattr(os, "rename", real)
+    journal = RenameJournal(journal.path)
+    journal.recover()
+    assert _files(abc) == {"a": "c", "b": "a", "c": "b"}
+    assert journal.can_undo()
+    journal.undo_last()
+    assert _files(abc) == {"a": "a", "b": "b", "c": "c"}